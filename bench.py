@@ -0,0 +1,299 @@
+# bench.py - Benchmarks for MindMath's non-GUI hot paths and summary/leaderboard renderers
+#
+#   python bench.py                       # quick run (10k and 100k line score files)
+#   python bench.py --full                # 10k, 1M and 10M line score files
+#   python bench.py --compare bench_results/<old>.json   # flag regressions against an earlier run
+#
+# Results are written as JSON to bench_results/ so runs can be compared across releases.
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import main
+from engine import TOTAL_QUESTIONS, simulate_session
+from questions import DIFFICULTY_LEVELS, QuestionPool, question_operator
+from expressions import EXPRESSION_TIERS
+from history import HISTORY_WINDOW, HistoryRecord, SessionHistory
+from scorestore import TextScoreStore, open_score_store
+from widgets import VirtualTextView
+
+QUICK_SIZES = (10_000, 100_000)
+FULL_SIZES = (10_000, 1_000_000, 10_000_000)
+MALFORMED_EVERY = 97 # One malformed line per this many
+REGRESSION_THRESHOLD = 0.10 # Flag anything more than 10% slower than the baseline
+RESULTS_DIR = "bench_results"
+SCORE_LINE_RE = re.compile(r"^[^,]+,\d+/\d+ \(\w+\)$")
+
+class StubText:
+    """Stands in for a Tk Text widget: records every call as one simulated Tcl round trip."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chars = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+
+    config = configure = delete = tag_configure = tag_add = see = yview = _call
+
+    def insert(self, index, *chunks_and_tags):
+        self.calls += 1
+        self.chars += sum(len(c) for c in chunks_and_tags[::2] if isinstance(c, str))
+
+    def get(self, *args):
+        self.calls += 1
+        return ""
+
+def measure(fn, number=1, repeat=5):
+    """Runs fn() `number` times per round for `repeat` rounds. Returns best/median seconds per call and calls/s."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    best = min(times)
+    return {"best_s": best, "median_s": statistics.median(times), "ops_per_s": 1 / best if best else None, "number": number, "repeat": repeat}
+
+def measure_once(fn):
+    """Times a single call of something that can't be repeated (e.g. a one-time import)."""
+    return measure(fn, number=1, repeat=1)
+
+# ========== Fixtures ==========
+
+def write_score_file(path, n_lines, rng):
+    """Writes n_lines of 'Name,Score/Total (Mode)' with a malformed line every MALFORMED_EVERY lines."""
+    modes = ("Easy", "Medium", "Hard", "Random")
+    malformed = ("garbage", "Name Without Comma 7/10", "Bad,x/10 (Easy)", ",", "")
+    chunk = []
+    with open(path, "w") as f:
+        for i in range(n_lines):
+            if i % MALFORMED_EVERY == MALFORMED_EVERY - 1:
+                chunk.append(malformed[i % len(malformed)])
+            else:
+                chunk.append(f"Player{rng.randrange(5000)},{rng.randrange(TOTAL_QUESTIONS + 1)}/{TOTAL_QUESTIONS} ({modes[i % 4]})")
+            if len(chunk) >= 100_000:
+                f.write("\n".join(chunk) + "\n"); chunk = []
+        if chunk: f.write("\n".join(chunk) + "\n")
+
+def use_store(backend, score_file, db_file, compact=False):
+    """Points main's score helpers at the given files and drops any open store/cache.
+
+    The text store is opened here without main's startup compaction (unless compact=True), so full-file reads are measured as-is.
+    """
+    if main._score_store is not None: main._score_store.close()
+    main.SCORE_BACKEND, main.SCORE_FILE, main.SCORE_DB_FILE = backend, score_file, db_file
+    main._score_store = main._leaderboard_cache = None
+    if backend == "text" and not compact: main._score_store = open_score_store(backend, score_file, db_file)
+
+def fake_history(n, rng):
+    """A SessionHistory of n random records; streamed to a log past HISTORY_WINDOW, as QuizSession does."""
+    results = ("Correct", "Correct (Retry)", "Wrong (Retry Failed)", "Wrong (Skipped)", "Timeout", "Invalid (Empty)")
+    pool = QuestionPool("random", rng=rng)
+    history = SessionHistory.streaming() if n > HISTORY_WINDOW else SessionHistory()
+    for _ in range(n):
+        question, answer, difficulty = pool.next_question()
+        history.append(HistoryRecord(question, str(answer), answer, rng.choice(results), question_operator(question), difficulty, [rng.uniform(0.5, 8)]))
+    return history
+
+# ========== Benchmarks ==========
+
+def bench_questions(results):
+    for mode in DIFFICULTY_LEVELS + ("random",) + tuple(EXPRESSION_TIERS):
+        n = 2_000 if mode in EXPRESSION_TIERS else 20_000
+        results[f"generate_question_data[{mode}]"] = measure(lambda: main.generate_question_data(mode), number=n)
+        pool = QuestionPool(mode)
+        results[f"question_pool[{mode}]"] = measure(pool.next_question, number=n)
+
+def bench_time_limit(results):
+    modes = DIFFICULTY_LEVELS + tuple(EXPRESSION_TIERS) + ("other",)
+    results["get_time_limit"] = measure(lambda: [main.get_time_limit(m, q) for m in modes for q in range(1, TOTAL_QUESTIONS + 1)], number=2_000)
+
+def load_top5_cold():
+    main.get_leaderboard_cache().invalidate()
+    return main.top_scores()
+
+def bench_load_scores(results, sizes, workdir, rng):
+    for size in sizes:
+        score_file = os.path.join(workdir, f"scores_{size}.txt")
+        db_file = os.path.join(workdir, f"scores_{size}.db")
+        print(f"  {size:,} line score file...")
+        write_score_file(score_file, size, rng)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Malformed-line warnings
+            bench_load_score_file(results, size, score_file, db_file)
+        os.remove(score_file); os.remove(db_file)
+        shutil.rmtree(os.path.splitext(score_file)[0] + "_archive")
+
+def bench_load_score_file(results, size, score_file, db_file):
+    """Text full scan / cold and cached top-5, then SQLite import and indexed top-5 on one file."""
+    repeat = 3 if size <= 100_000 else 1
+
+    use_store("text", score_file, db_file)
+    results[f"load_scores[text,{size}]"] = measure(lambda: main.top_scores(None), repeat=repeat)
+    results[f"load_scores_top5_cold[text,{size}]"] = measure(lambda: load_top5_cold(), repeat=repeat)
+    results[f"load_scores_top5_cached[text,{size}]"] = measure(lambda: main.top_scores(), number=1_000)
+    results[f"compact[text,{size}]"] = measure_once(main.get_score_store().compact)
+    results[f"load_scores_top5_compacted[text,{size}]"] = measure(lambda: load_top5_cold(), number=100)
+
+    use_store("sqlite", score_file, db_file)
+    results[f"sqlite_import[{size}]"] = measure_once(main.get_score_store) # First open imports the text file
+    results[f"load_scores_top5_cold[sqlite,{size}]"] = measure(lambda: main.get_score_store().top(main.LEADERBOARD_SIZE), number=100)
+    results[f"load_scores_top5_mode[sqlite,{size}]"] = measure(lambda: main.get_score_store().top(main.LEADERBOARD_SIZE, "hard"), number=100)
+    use_store("text", score_file, db_file) # Closes the database before it is deleted
+
+def bench_save_score(results, workdir, rng):
+    """Saving a finished game as the app does: score, answer latencies and player stats."""
+    session = simulate_session("easy", rng)
+    for backend in ("text", "sqlite"):
+        use_store(backend, os.path.join(workdir, f"save_{backend}.txt"), os.path.join(workdir, f"save_{backend}.db"))
+        results[f"save_score[{backend}]"] = measure(lambda: main.record_game(session), number=500)
+        results[f"player_stats[{backend}]"] = measure(lambda: main.load_player_stats(session.player_name), number=1_000)
+    session.close()
+
+def save_scores_in_process(score_file, worker, n):
+    """Process body for bench_concurrent_saves (module level so multiprocessing can pickle it)."""
+    store = TextScoreStore(score_file)
+    for i in range(n):
+        store.add(f"Proc{worker}", i % (TOTAL_QUESTIONS + 1), TOTAL_QUESTIONS, "easy")
+    store.close()
+
+def bench_concurrent_saves(results, workdir, threads=16, processes=4, per_worker=200):
+    """Text-store adds from many threads (one group commit per batch) and many processes (file lock), checked for torn lines."""
+    store = TextScoreStore(os.path.join(workdir, "concurrent_threads.txt"))
+    workers = [threading.Thread(target=lambda w=w: [store.add(f"Thread{w}", 7, TOTAL_QUESTIONS, "easy") for _ in range(per_worker)])
+               for w in range(threads)]
+    start = time.perf_counter()
+    for worker in workers: worker.start()
+    for worker in workers: worker.join()
+    elapsed = time.perf_counter() - start
+    results[f"save_score_threads[text,{threads}]"] = {"best_s": elapsed / (threads * per_worker), "ops_per_s": threads * per_worker / elapsed}
+    store.close()
+
+    score_file = os.path.join(workdir, "concurrent_processes.txt")
+    workers = [multiprocessing.Process(target=save_scores_in_process, args=(score_file, w, per_worker)) for w in range(processes)]
+    start = time.perf_counter()
+    for worker in workers: worker.start()
+    for worker in workers: worker.join()
+    elapsed = time.perf_counter() - start
+    results[f"save_score_processes[text,{processes}]"] = {"best_s": elapsed / (processes * per_worker), "ops_per_s": processes * per_worker / elapsed}
+    with open(score_file) as f:
+        lines = f.read().splitlines()
+    malformed = sum(1 for line in lines if not SCORE_LINE_RE.match(line))
+    results[f"save_score_processes[text,{processes}]"]["malformed_lines"] = malformed + processes * per_worker - len(lines)
+
+def bench_renderers(results, rng):
+    for n in (10, 1_000, 10_000):
+        history = fake_history(n, rng)
+        gui = SimpleNamespace(session=SimpleNamespace(history=history))
+        widget = StubText()
+        summary_view = VirtualTextView(widget, visible_rows=12)
+        results[f"display_game_summary[{n}]"] = measure(lambda: main.MindMathGUI.display_game_summary(gui, summary_view), repeat=3)
+        results[f"display_game_summary[{n}]"]["widget_calls"] = widget.calls // 3
+        results[f"summary_scroll[{n}]"] = measure(lambda: summary_view.scroll_to((summary_view.first_row + 7) % n), number=200)
+        history.close()
+    widget = StubText()
+
+    def redraw_leaderboard():
+        widget.rendered_args = widget.rendered_rows = None # Defeat the unchanged-content shortcut
+        main.MindMathGUI.display_leaderboard(SimpleNamespace(), widget, main.top_scores())
+
+    results["display_leaderboard"] = measure(redraw_leaderboard, number=200)
+    results["display_leaderboard"]["widget_calls"] = widget.calls // (200 * 5)
+    results["display_leaderboard_unchanged"] = measure(lambda: main.MindMathGUI.display_leaderboard(SimpleNamespace(), widget, main.top_scores()), number=200)
+    scores = main.top_scores()
+    updates = itertools.cycle([scores, scores[:-1] + [("Newcomer", 0, "0/10 (Easy)")]]) # A new score entering at the bottom
+    widget.calls = widget.chars = 0
+    results["display_leaderboard_one_row_changed"] = measure(lambda: main.MindMathGUI.display_leaderboard(SimpleNamespace(), widget, next(updates)), number=200)
+    results["display_leaderboard_one_row_changed"]["widget_calls"] = widget.calls // (200 * 5)
+    results["display_leaderboard_one_row_changed"]["chars_inserted"] = widget.chars // (200 * 5) # A full redraw inserts the whole table
+
+# ========== Reporting ==========
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    """Prints every benchmark's change against a baseline file; returns the names that regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old or not old.get("best_s"): continue
+        change = current["best_s"] / old["best_s"] - 1
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            regressions.append(name); flag = "  <-- REGRESSION"
+        print(f"{name:<48} {old['best_s'] * 1e6:>14.1f}us -> {current['best_s'] * 1e6:>14.1f}us {change:+8.1%}{flag}")
+    return regressions
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MindMath's hot paths.")
+    parser.add_argument("--full", action="store_true", help="Use 10k/1M/10M line score files (slow)")
+    parser.add_argument("--sizes", help="Comma-separated score file sizes, overriding --full")
+    parser.add_argument("--only", help="Comma-separated groups: questions,time_limit,load_scores,save_score,concurrent_save,renderers")
+    parser.add_argument("--output", help="Result file (default: bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    sizes = tuple(int(s) for s in args.sizes.split(",")) if args.sizes else (FULL_SIZES if args.full else QUICK_SIZES)
+    groups = args.only.split(",") if args.only else ["questions", "time_limit", "load_scores", "save_score", "concurrent_save", "renderers"]
+    rng = random.Random(args.seed)
+    results = {}
+    original_store = (main.SCORE_BACKEND, main.SCORE_FILE, main.SCORE_DB_FILE)
+    workdir = tempfile.mkdtemp(prefix="mindmath_bench_")
+    try:
+        for group in groups:
+            print(f"Running {group}...")
+            if group == "questions": bench_questions(results)
+            elif group == "time_limit": bench_time_limit(results)
+            elif group == "load_scores": bench_load_scores(results, sizes, workdir, rng)
+            elif group == "save_score": bench_save_score(results, workdir, rng)
+            elif group == "concurrent_save": bench_concurrent_saves(results, workdir)
+            elif group == "renderers":
+                use_store("text", os.path.join(workdir, "render.txt"), os.path.join(workdir, "render.db"))
+                write_score_file(main.SCORE_FILE, 10_000, rng)
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Malformed-line warnings
+                    bench_renderers(results, rng)
+            else:
+                parser.error(f"Unknown group '{group}'")
+    finally:
+        use_store(*original_store)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, r in results.items():
+        rate = f"{r['ops_per_s']:>14,.0f}/s" if r.get("ops_per_s") else ""
+        print(f"{name:<48} {r['best_s'] * 1e6:>14.1f}us {rate}")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": {"time": time.time(), "git": git_revision(), "python": sys.version.split()[0], "platform": platform.platform(),
+                            "sizes": sizes, "seed": args.seed}, "results": results}, f, indent=1)
+    print(f"Results written to {output}")
+
+    if args.compare and compare(results, args.compare):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
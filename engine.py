@@ -0,0 +1,273 @@
+# engine.py - Headless MindMath game rules (no Tk imports)
+
+import os
+import random
+import time
+from collections import namedtuple
+from questions import QUESTION_BATCH_SIZE, QuestionPool, question_operator
+from stats import GameStats, LatencyReport
+from history import HistoryRecord, SessionHistory, HISTORY_WINDOW
+
+TOTAL_QUESTIONS = 10 # Questions per standard game; sessions can be longer, or endless (total_questions=None)
+
+# Session states
+STATE_READY = "ready"             # Before the first question / between questions
+STATE_QUESTION = "question"       # Waiting for the first answer
+STATE_RETRY_OFFER = "retry_offer" # First answer was wrong; waiting for retry or skip
+STATE_RETRY = "retry"             # Waiting for the retry answer
+STATE_FINISHED = "finished"
+
+# Results that end a question after the longer feedback delay (retry/skip/timeout)
+LONG_FEEDBACK_RESULTS = ("Wrong (Retry Failed)", "Wrong (Skipped)", "Timeout")
+
+# result: history result string, or "Retry Offered"; done: True if the question is finished
+Outcome = namedtuple("Outcome", "result done correct_answer")
+
+def new_session_seed():
+    """A fresh 64-bit seed for a session's question stream."""
+    return int.from_bytes(os.urandom(8), "little")
+
+def session_batch_size(total_questions):
+    """Questions a session's own pool generates per refill; part of what a seed reproduces."""
+    return min(total_questions, QUESTION_BATCH_SIZE) if total_questions else QUESTION_BATCH_SIZE
+
+def get_time_limit(difficulty_mode, question_index):
+    """Calculates the time limit in seconds based on difficulty mode and question progress."""
+    if difficulty_mode == "easy":
+        base_time = 40
+        time_reduction_per_q = 1.5
+        min_time = 20
+    elif difficulty_mode == "medium":
+        base_time = 30
+        time_reduction_per_q = 1.5
+        min_time = 15
+    elif difficulty_mode == "hard":
+        base_time = 25
+        time_reduction_per_q = 1.5
+        min_time = 10
+    elif difficulty_mode == "expert": # Three operands with precedence/division
+        base_time = 45
+        time_reduction_per_q = 1.5
+        min_time = 25
+    elif difficulty_mode == "master": # Four operands, parentheses
+        base_time = 60
+        time_reduction_per_q = 2
+        min_time = 30
+    else: # Default to medium
+        base_time = 30
+        time_reduction_per_q = 1.5
+        min_time = 15
+    # Adjust time reduction based on TOTAL_QUESTIONS to ensure it doesn't drop too fast
+    # Example: Scale reduction based on total questions (optional, but can be smoother)
+    # time_reduction_per_q = time_reduction_per_q * (5 / TOTAL_QUESTIONS) # Scale reduction if needed
+    time_limit = base_time - (question_index - 1) * time_reduction_per_q
+    return max(min_time, int(time_limit))
+
+class QuizSession:
+    """One player's game: questions, answers, retry/skip/timeout rules, score, streak and history.
+
+    The session never schedules anything itself; the caller (GUI, server, simulation) decides when
+    to call next_question() and timeout(), which keeps it usable without a display.
+    Without a shared question_pool, questions come from the session's own random.Random(seed), so
+    the same seed (see replay.py) reproduces the same questions whatever else is running.
+    Long and endless sessions stream their history to a session log (see history.py), so memory
+    stays bounded however many questions are played.
+    """
+
+    def __init__(self, player_name, difficulty_mode, total_questions=TOTAL_QUESTIONS, question_pool=None, clock=time.time, latency_clock=time.perf_counter,
+                 seed=None, recorder=None):
+        self.player_name = player_name or "Player"
+        self.difficulty_mode = difficulty_mode
+        self.total_questions = total_questions
+        self.seed = new_session_seed() if seed is None else seed
+        self.owns_question_stream = question_pool is None # False when questions come from a shared pool (e.g. the server's)
+        self.question_pool = question_pool or QuestionPool(difficulty_mode, session_batch_size(total_questions), random.Random(self.seed))
+        self.recorder = recorder # Optional replay.SessionRecorder; receives every question and player action
+        self.clock = clock
+        self.latency_clock = latency_clock # High-resolution clock for answer latencies
+        self.score = 0
+        self.streak = 0
+        self.current_question_index = 0
+        self.state = STATE_READY
+        self.current_question_str = ""
+        self.correct_answer = None
+        self.actual_difficulty = None
+        self.current_time_limit = 0
+        self.question_start_time = 0
+        self.attempt_start = 0
+        self.attempt_latencies = [] # Seconds per answer attempt on the current question
+        if total_questions is None or total_questions > HISTORY_WINDOW:
+            self.history = SessionHistory.streaming()
+        else:
+            self.history = SessionHistory()
+        self._latency_report = LatencyReport() # Running aggregates, updated per finished question
+        self._game_stats = GameStats()
+
+    # --- Queries ---
+    @property
+    def is_finished(self):
+        return self.state == STATE_FINISHED
+
+    @property
+    def awaiting_answer(self):
+        return self.state in (STATE_QUESTION, STATE_RETRY)
+
+    @property
+    def is_endless(self):
+        return self.total_questions is None
+
+    @property
+    def questions_answered(self):
+        return len(self.history)
+
+    def mode_display(self):
+        """Mode name for display, e.g. 'Random (Hard)'."""
+        if self.difficulty_mode == "random" and self.actual_difficulty:
+            return f"Random ({self.actual_difficulty.capitalize()})"
+        return self.difficulty_mode.capitalize()
+
+    # --- Transitions ---
+    def next_question(self):
+        """Advances to the next question. Returns the question string, or None once the game is over."""
+        if self.state == STATE_FINISHED: return None
+        if not self.is_endless and self.current_question_index >= self.total_questions:
+            self.state = STATE_FINISHED
+            return None
+        self.current_question_index += 1
+        self.current_question_str, self.correct_answer, self.actual_difficulty = self.question_pool.next_question()
+        difficulty_for_timer = self.difficulty_mode if self.difficulty_mode != "random" else self.actual_difficulty
+        self.current_time_limit = get_time_limit(difficulty_for_timer, self.current_question_index)
+        self.question_start_time = self.clock()
+        self.attempt_start = self.latency_clock()
+        self.attempt_latencies = []
+        self.state = STATE_QUESTION
+        if self.recorder: self.recorder.question(self.attempt_start, self.current_question_str, self.correct_answer, self.actual_difficulty)
+        return self.current_question_str
+
+    def submit(self, user_answer_str):
+        """Checks an answer. A first wrong answer offers a retry; everything else finishes the question."""
+        if not self.awaiting_answer:
+            raise ValueError(f"Cannot submit an answer in state '{self.state}'")
+        now = self.latency_clock()
+        self.attempt_latencies.append(now - self.attempt_start)
+        outcome = self._check_answer(user_answer_str)
+        if self.recorder: self.recorder.answer(now, user_answer_str, outcome.result)
+        return outcome
+
+    def _check_answer(self, user_answer_str):
+        user_answer_str = user_answer_str.strip()
+        is_retry = self.state == STATE_RETRY
+        if not user_answer_str:
+            self.streak = 0
+            return self._finish(user_answer_str, "Invalid (Empty)")
+        try:
+            user_answer = int(user_answer_str)
+        except ValueError:
+            self.streak = 0
+            return self._finish(user_answer_str, "Invalid (Non-numeric)") # Cannot retry invalid input
+
+        if user_answer == self.correct_answer:
+            if is_retry:
+                return self._finish(user_answer_str, "Correct (Retry)") # No score/streak increase on retry
+            self.score += 1
+            self.streak += 1
+            return self._finish(user_answer_str, "Correct")
+
+        self.streak = 0
+        if is_retry: # Failed the retry
+            return self._finish(user_answer_str, "Wrong (Retry Failed)")
+        self.state = STATE_RETRY_OFFER # Don't record history yet, wait for retry/skip outcome
+        return Outcome("Retry Offered", False, self.correct_answer)
+
+    def retry(self):
+        """Accepts the retry offer. The timer does not restart."""
+        if self.state != STATE_RETRY_OFFER:
+            raise ValueError(f"Cannot retry in state '{self.state}'")
+        self.state = STATE_RETRY
+        self.attempt_start = self.latency_clock() # Retry latency counts from accepting the retry
+        if self.recorder: self.recorder.retry(self.attempt_start)
+
+    def skip(self):
+        """Declines the retry offer."""
+        if self.state != STATE_RETRY_OFFER:
+            raise ValueError(f"Cannot skip in state '{self.state}'")
+        if self.recorder: self.recorder.skip(self.latency_clock())
+        return self._finish("Skipped", "Wrong (Skipped)")
+
+    def timeout(self):
+        """Ends the current question as timed out. Returns None if there is no open question."""
+        if self.state not in (STATE_QUESTION, STATE_RETRY_OFFER, STATE_RETRY):
+            return None
+        if self.recorder: self.recorder.timeout(self.latency_clock())
+        self.streak = 0
+        return self._finish("Timeout", "Timeout") # Cannot retry timeout
+
+    def finish(self):
+        """Ends the session early (e.g. an endless drill); an unanswered current question is dropped."""
+        if self.recorder and self.state != STATE_FINISHED: self.recorder.finish(self.latency_clock())
+        self.state = STATE_FINISHED
+
+    def close(self):
+        """Releases the session log, if any."""
+        self.history.close()
+
+    def _finish(self, user_answer_display, result):
+        self.record_history(user_answer_display, result)
+        self.state = STATE_READY
+        return Outcome(result, True, self.correct_answer)
+
+    def record_history(self, user_answer_display, result):
+        """Adds the details of the completed question to the game history."""
+        operator = question_operator(self.current_question_str)
+        record = HistoryRecord(self.current_question_str, user_answer_display, self.correct_answer, result,
+                               operator, self.actual_difficulty, self.attempt_latencies)
+        self.history.append(record)
+        for latency in self.attempt_latencies:
+            self._latency_report.add(operator, self.actual_difficulty, latency)
+        self._game_stats.add(operator, result == "Correct") # A retried answer doesn't count, as for the score and streak
+
+    def latency_report(self):
+        """This game's answer latencies as a LatencyReport (per operator and per difficulty)."""
+        return self._latency_report
+
+    def game_stats(self):
+        """This game's per-operator accuracy and answer runs as a GameStats, for the player's all-time stats."""
+        return self._game_stats
+
+# ========== Headless Simulation ==========
+
+def simulate_session(difficulty_mode, rng=random, question_pool=None, accuracy=0.7, retry_rate=0.5, timeout_rate=0.05, total_questions=TOTAL_QUESTIONS,
+                     seed=None, recorder=None, latency_clock=time.perf_counter):
+    """Plays one session with a random simulated player. Returns the finished QuizSession.
+
+    Without a question_pool the session draws from its own seeded stream (seed defaults to one drawn from rng).
+    """
+    if question_pool is None and seed is None: seed = rng.getrandbits(64)
+    session = QuizSession("Sim", difficulty_mode, total_questions, question_pool, seed=seed, recorder=recorder, latency_clock=latency_clock)
+    while session.next_question() is not None:
+        if rng.random() < timeout_rate:
+            session.timeout()
+            continue
+        correct = rng.random() < accuracy
+        outcome = session.submit(str(session.correct_answer if correct else session.correct_answer + 1))
+        if not outcome.done:
+            if rng.random() < retry_rate:
+                session.retry()
+                session.submit(str(session.correct_answer if rng.random() < accuracy else session.correct_answer - 1))
+            else:
+                session.skip()
+    return session
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run headless MindMath sessions and report throughput.")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--mode", default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    sim_rng = random.Random(args.seed)
+    shared_pool = QuestionPool(args.mode, rng=sim_rng)
+    start = time.perf_counter()
+    total_score = sum(simulate_session(args.mode, sim_rng, shared_pool).score for _ in range(args.sessions))
+    elapsed = time.perf_counter() - start
+    print(f"{args.sessions} sessions ({args.mode}) in {elapsed:.3f}s = {args.sessions / elapsed:,.0f} sessions/s, mean score {total_score / args.sessions:.2f}")
@@ -0,0 +1,174 @@
+# expressions.py - Compiled arithmetic expression engine for the harder MindMath tiers
+
+import operator
+import random
+import re
+from functools import lru_cache
+
+class ExpressionError(ValueError):
+    """Raised for malformed expressions, inexact division or a tier whose constraints can't be met."""
+
+def _exact_div(a, b):
+    if b == 0 or a % b:
+        raise ExpressionError(f"{a} / {b} is not an exact integer division")
+    return a // b
+
+BINARY_OPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': _exact_div}
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+TOKEN_RE = re.compile(r"\s*(?:(\d+)|(\S))")
+
+# Multi-operand tiers. "leaf" bounds each operand, "bounds" every intermediate result (and the answer).
+EXPRESSION_TIERS = {
+    "expert": {"operands": 3, "ops": ('+', '-', '*', '/'), "leaf": (2, 20), "bounds": (0, 150)},
+    "master": {"operands": 4, "ops": ('+', '-', '*', '/'), "leaf": (2, 30), "bounds": (0, 300)},
+}
+MAX_GENERATION_ATTEMPTS = 50
+
+# ========== Parsing and Compilation ==========
+
+def tokenize(text):
+    """Splits an expression into ints and operator/parenthesis characters."""
+    tokens = []
+    for number, symbol in TOKEN_RE.findall(text):
+        if number:
+            tokens.append(int(number))
+        elif symbol in BINARY_OPS or symbol in "()":
+            tokens.append(symbol)
+        else:
+            raise ExpressionError(f"Unexpected character '{symbol}' in '{text}'")
+    return tokens
+
+def to_postfix(tokens):
+    """Shunting-yard: converts infix tokens to a postfix stack program (tuple of ints and operators)."""
+    program, op_stack = [], []
+    expect_operand = True
+    for tok in tokens:
+        if isinstance(tok, int):
+            if not expect_operand: raise ExpressionError("Missing operator between numbers")
+            program.append(tok)
+            expect_operand = False
+        elif tok == '(':
+            if not expect_operand: raise ExpressionError("Missing operator before '('")
+            op_stack.append(tok)
+        elif tok == ')':
+            if expect_operand: raise ExpressionError("Empty or incomplete parentheses")
+            while op_stack and op_stack[-1] != '(':
+                program.append(op_stack.pop())
+            if not op_stack: raise ExpressionError("Unbalanced ')'")
+            op_stack.pop()
+        else:
+            if expect_operand: raise ExpressionError(f"Operator '{tok}' is missing an operand")
+            while op_stack and op_stack[-1] != '(' and PRECEDENCE[op_stack[-1]] >= PRECEDENCE[tok]:
+                program.append(op_stack.pop())
+            op_stack.append(tok)
+            expect_operand = True
+    if expect_operand: raise ExpressionError("Expression ends with an operator")
+    while op_stack:
+        tok = op_stack.pop()
+        if tok == '(': raise ExpressionError("Unbalanced '('")
+        program.append(tok)
+    return tuple(program)
+
+def _build_closure(program):
+    """Turns a postfix program into nested closures so evaluation does no dispatch or parsing."""
+    stack = []
+    for tok in program:
+        if tok.__class__ is int:
+            stack.append(lambda v=tok: v)
+        else:
+            right, left = stack.pop(), stack.pop()
+            stack.append(lambda f=BINARY_OPS[tok], l=left, r=right: f(l(), r()))
+    return stack[0]
+
+class CompiledExpression:
+    """An expression parsed once into a postfix program and a closure."""
+
+    __slots__ = ("text", "program", "evaluate")
+
+    def __init__(self, text):
+        self.text = text
+        self.program = to_postfix(tokenize(text))
+        self.evaluate = _build_closure(self.program)
+
+@lru_cache(maxsize=4096)
+def compile_expression(text):
+    """Parses and compiles an expression, caching the result by its text."""
+    return CompiledExpression(text)
+
+def check_answer(question_str, answer):
+    """True if answer is the exact value of question_str."""
+    return compile_expression(question_str).evaluate() == answer
+
+# ========== Constrained Generation ==========
+
+def _split(op, value, left_range, right_range, rng):
+    """Picks (a, b) with a op b == value, a in left_range and b in right_range, or None if impossible."""
+    (llo, lhi), (rlo, rhi) = left_range, right_range
+    if op == '+':
+        lo, hi = max(rlo, value - lhi), min(rhi, value - llo)
+        if lo > hi: return None
+        b = rng.randint(lo, hi)
+        return value - b, b
+    if op == '-':
+        lo, hi = max(rlo, llo - value), min(rhi, lhi - value)
+        if lo > hi: return None
+        b = rng.randint(lo, hi)
+        return value + b, b
+    if op == '*':
+        divisors = [b for b in range(max(2, rlo), min(rhi, value // 2) + 1) if value % b == 0 and llo <= value // b <= lhi]
+        if not divisors: return None
+        b = rng.choice(divisors)
+        return value // b, b
+    if value <= 0: return None # op == '/'; 0 / b is too trivial
+    lo, hi = max(2, rlo, -(-llo // value)), min(rhi, lhi // value)
+    if lo > hi: return None
+    b = rng.randint(lo, hi)
+    return value * b, b
+
+def _build_tree(value, n_operands, spec, rng):
+    """Builds a tree of (op, left, right) tuples and int leaves that evaluates to value, or None."""
+    leaf_range = (max(spec["leaf"][0], spec["bounds"][0]), min(spec["leaf"][1], spec["bounds"][1]))
+    if n_operands == 1:
+        return value if leaf_range[0] <= value <= leaf_range[1] else None
+    n_left = rng.randint(1, n_operands - 1)
+    n_right = n_operands - n_left
+    left_range = leaf_range if n_left == 1 else spec["bounds"]
+    right_range = leaf_range if n_right == 1 else spec["bounds"]
+    for op in rng.sample(spec["ops"], len(spec["ops"])):
+        split = _split(op, value, left_range, right_range, rng)
+        if split is None: continue
+        left = _build_tree(split[0], n_left, spec, rng)
+        if left is None: continue
+        right = _build_tree(split[1], n_right, spec, rng)
+        if right is None: continue
+        return (op, left, right)
+    return None
+
+def render(tree):
+    """Formats a tree with just the parentheses needed to keep its evaluation order."""
+    if isinstance(tree, int): return str(tree)
+    op, left, right = tree
+    left_str, right_str = render(left), render(right)
+    if not isinstance(left, int) and PRECEDENCE[left[0]] < PRECEDENCE[op]:
+        left_str = f"({left_str})"
+    if not isinstance(right, int) and PRECEDENCE[right[0]] <= PRECEDENCE[op]:
+        right_str = f"({right_str})"
+    return f"{left_str} {op} {right_str}"
+
+def max_expression_length(tier):
+    """Longest question text a tier can render: every operand at the widest leaf, and a pair of parentheses
+    around every operator but the root (the most render() can need)."""
+    spec = EXPRESSION_TIERS[tier]
+    n = spec["operands"]
+    return n * len(str(spec["leaf"][1])) + (n - 1) * len(" + ") + (n - 2) * len("()")
+
+def generate_expression(tier, rng=random):
+    """Generates (question_str, answer) for a multi-operand tier with all intermediates inside its bounds."""
+    spec = EXPRESSION_TIERS[tier]
+    lo, hi = spec["bounds"]
+    for _ in range(MAX_GENERATION_ATTEMPTS):
+        answer = rng.randint(lo, hi)
+        tree = _build_tree(answer, spec["operands"], spec, rng)
+        if tree is not None:
+            return render(tree), answer
+    raise ExpressionError(f"Could not satisfy the constraints of tier '{tier}'")
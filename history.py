@@ -0,0 +1,110 @@
+# history.py - Compact per-question history with optional streaming to an on-disk session log
+
+import os
+from array import array
+from collections import deque
+
+HISTORY_WINDOW = 200 # Records kept in RAM when streaming to a log
+HISTORY_CHUNK = 100  # Records written per log flush; also the granularity of the read index
+
+class HistoryRecord:
+    """One finished question."""
+
+    __slots__ = ("question", "user_answer", "correct_answer", "result", "operator", "difficulty", "latencies")
+
+    def __init__(self, question, user_answer, correct_answer, result, operator, difficulty, latencies):
+        self.question = question
+        self.user_answer = user_answer # Store string representation
+        self.correct_answer = correct_answer
+        self.result = result # e.g., "Correct", "Wrong (Retry Failed)", "Timeout"
+        self.operator = operator
+        self.difficulty = difficulty
+        self.latencies = latencies # Seconds per attempt; empty for a timeout
+
+    def to_row(self):
+        return [self.question, self.user_answer, self.correct_answer, self.result, self.operator, self.difficulty, self.latencies]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+class SessionHistory:
+    """A session's history records.
+
+    Without a log every record stays in memory (normal 10-question games). With log_path, records are
+    appended to a JSON-lines log HISTORY_CHUNK at a time and only the last `window` stay in RAM; older
+    rows are read back from the log on demand.
+    """
+
+    def __init__(self, log_path=None, window=HISTORY_WINDOW, chunk_size=HISTORY_CHUNK):
+        self.log_path = log_path
+        self.chunk_size = chunk_size
+        self._recent = deque(maxlen=window if log_path else None)
+        self._pending = [] # Not yet written to the log
+        self._chunk_offsets = array('q') # Byte offset of every chunk_size-th record in the log
+        self._log = open(log_path, "w+b") if log_path else None # Binary, so chunk offsets are exact byte positions
+        self._count = 0
+
+    @classmethod
+    def streaming(cls, directory=None, window=HISTORY_WINDOW, chunk_size=HISTORY_CHUNK):
+        """A history backed by a new temporary session log."""
+        import tempfile # Only long drills need it; kept off the app's cold-start import path
+        fd, path = tempfile.mkstemp(prefix="mindmath_session_", suffix=".jsonl", dir=directory)
+        os.close(fd)
+        return cls(path, window, chunk_size)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, record):
+        self._recent.append(record)
+        self._count += 1
+        if self._log:
+            self._pending.append(record)
+            if len(self._pending) >= self.chunk_size: self.flush()
+
+    def flush(self):
+        """Writes pending records to the log in one write."""
+        if not self._log or not self._pending: return
+        import json
+        self._log.seek(0, os.SEEK_END)
+        first_index = self._count - len(self._pending)
+        lines = []
+        offset = self._log.tell()
+        for i, record in enumerate(self._pending, start=first_index):
+            line = (json.dumps(record.to_row(), ensure_ascii=False) + "\n").encode("utf-8")
+            if i % self.chunk_size == 0: self._chunk_offsets.append(offset)
+            offset += len(line)
+            lines.append(line)
+        self._log.write(b"".join(lines))
+        self._log.flush()
+        self._pending.clear()
+
+    def rows(self, start, stop):
+        """Records with index in [start, stop), from RAM when recent, otherwise read lazily from the log."""
+        stop = min(stop, self._count)
+        if start >= stop: return []
+        first_in_ram = self._count - len(self._recent)
+        if start >= first_in_ram:
+            return [self._recent[i - first_in_ram] for i in range(start, stop)]
+        self.flush()
+        import json
+        chunk = start // self.chunk_size
+        self._log.seek(self._chunk_offsets[chunk])
+        records = []
+        for i in range(chunk * self.chunk_size, stop):
+            line = self._log.readline()
+            if i >= start: records.append(HistoryRecord.from_row(json.loads(line)))
+        self._log.seek(0, os.SEEK_END)
+        return records
+
+    def __iter__(self):
+        for start in range(0, self._count, self.chunk_size):
+            yield from self.rows(start, start + self.chunk_size)
+
+    def close(self, delete=True):
+        """Closes (and by default deletes) the session log."""
+        if self._log:
+            self._log.close()
+            self._log = None
+            if delete and os.path.exists(self.log_path): os.remove(self.log_path)
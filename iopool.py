@@ -0,0 +1,69 @@
+# iopool.py - Blocking score I/O on worker threads, results handed back to the Tk thread (no Tk imports; needs any object with after/after_cancel)
+
+import queue
+import time
+
+IO_WORKERS = 1 # One worker runs jobs in submission order, so a query submitted after a save sees it
+IO_POLL_MS = 15 # How often the Tk thread checks for finished jobs while any are outstanding
+
+class BackgroundIO:
+    """Runs blocking I/O (score saves, leaderboard queries) on a thread pool so the Tk event loop never waits on disk.
+
+    Workers never touch Tk: a finished job goes into a queue that the Tk thread drains with root.after()
+    while jobs are outstanding, and on_done(result) / on_error(exception) run there, where it is safe to
+    update widgets or show a messagebox.
+    """
+
+    def __init__(self, root, max_workers=IO_WORKERS, poll_ms=IO_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.max_workers = max_workers
+        self._executor = None # Created by the first submit(); concurrent.futures is slow to import on a cold start
+        self._finished = queue.SimpleQueue() # (future, on_done, on_error), filled by worker threads
+        self._pending = 0
+        self._after_id = None
+        self._poll_due = 0 # perf_counter() deadline of the armed poll, for the metrics
+        self.metrics = None # Optional metrics.Metrics: job durations, errors and poll lateness
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        """Runs fn(*args) on a worker; call from the Tk thread only."""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="score-io")
+        if self.metrics is not None: fn = self.metrics.timed(f"io.{getattr(fn, '__name__', 'job')}", fn)
+        future = self._executor.submit(fn, *args)
+        self._pending += 1
+        future.add_done_callback(lambda f: self._finished.put((f, on_done, on_error)))
+        if self._after_id is None: self._arm()
+        return future
+
+    def _arm(self):
+        if self.metrics is not None: self._poll_due = time.perf_counter() + self.poll_ms / 1000
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._after_id = None
+        if self.metrics is not None: self.metrics.observe("after_late.io_poll", time.perf_counter() - self._poll_due)
+        while True:
+            try:
+                future, on_done, on_error = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            error = future.exception()
+            if error is None:
+                if on_done: on_done(future.result())
+            else:
+                if self.metrics is not None: self.metrics.count("io.errors")
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Background I/O failed: {error}")
+        if self._pending: self._arm()
+
+    def shutdown(self):
+        """Waits for queued jobs (e.g. a score still being saved) to finish; their callbacks are dropped."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._executor is not None: self._executor.shutdown(wait=True)
@@ -0,0 +1,74 @@
+# loadtest.py - Load-test client for the MindMath server (see server.py for the protocol)
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from expressions import compile_expression
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+async def play_session(host, port, mode, rng, accuracy, latencies):
+    """Plays one full game over its own connection, answering instantly. Returns the final score."""
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(message):
+        writer.write(json.dumps(message).encode() + b"\n")
+        await writer.drain()
+        start = time.perf_counter()
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        return reply
+
+    async def read_event():
+        return json.loads(await reader.readline())
+
+    try:
+        reply = await request({"cmd": "start", "name": f"Load{rng.randrange(10000)}", "mode": mode})
+        while reply["event"] == "question":
+            question = reply["question"]
+            # The client has no answer key; answer right or wrong by evaluating the question locally
+            answer = compile_expression(question).evaluate() if rng.random() < accuracy else -1
+            reply = await request({"cmd": "answer", "answer": str(answer)})
+            if reply["event"] == "retry_offer":
+                reply = await request({"cmd": "skip"})
+            if reply["event"] == "result":
+                reply = await read_event() # Next question or game_over follows every result
+        return reply.get("score", 0)
+    finally:
+        writer.close()
+
+async def run_load_test(host, port, sessions, concurrency, mode, accuracy, seed):
+    rng = random.Random(seed)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await play_session(host, port, mode, rng, accuracy, latencies)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(sessions)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, BaseException)]
+    latencies.sort()
+    print(f"{sessions - len(errors)}/{sessions} sessions ({concurrency} concurrent) in {elapsed:.2f}s = {sessions / elapsed:,.0f} sessions/s")
+    if latencies:
+        for label, q in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99)):
+            print(f"  {label} request latency: {latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000:.2f} ms")
+    if errors: print(f"  first error: {errors[0]!r}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running MindMath server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--mode", default="random")
+    parser.add_argument("--accuracy", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(run_load_test(args.host, args.port, args.sessions, args.concurrency, args.mode, args.accuracy, args.seed))
+
+if __name__ == "__main__":
+    main()
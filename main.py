@@ -1,16 +1,35 @@
 # main.py (Modified - 10 Questions per Level)
 
-import tkinter as tk
-from tkinter import messagebox, simpledialog, font, scrolledtext # Import scrolledtext
-import random
 import time
+STARTUP_START = time.perf_counter() # For --startup-timing; taken before the other imports
+
+import tkinter as tk
+from tkinter import messagebox, font # scrolledtext is imported when the first screen that needs it is built
 import os
+import threading
+from questions import generate_question_data, max_question_length
+from engine import QuizSession, get_time_limit, TOTAL_QUESTIONS, LONG_FEEDBACK_RESULTS
+from scheduler import TickScheduler, Countdown
+from iopool import BackgroundIO
+from widgets import create_virtual_text, configure_tags, replace_text, update_rows
+IMPORTS_DONE = time.perf_counter()
 
 SCORE_FILE = "scores.txt"
-TOTAL_QUESTIONS = 10 # <<< MODIFIED: Changed from 5 to 10 questions per game
+SCORE_DB_FILE = "scores.db" # Indexed store; scores.txt is imported into it on first run
+SCORE_BACKEND = os.environ.get("MINDMATH_SCORE_BACKEND", "sqlite") # "sqlite" (indexed) or "text" (plain scores.txt)
+RECORD_FILE = os.environ.get("MINDMATH_RECORD_FILE") # If set, every game is appended to this replay record (see replay.py)
+METRICS_FILE = os.environ.get("MINDMATH_METRICS_FILE") # If set, timer lateness, GUI and I/O timings are exported here (see metrics.py)
+# GUI methods timed when metrics are on
+TIMED_METHODS = ("next_question", "submit_answer", "end_game", "show_frame", "display_game_summary", "display_leaderboard")
+LEADERBOARD_SIZE = 5
+QUESTION_COUNT_CHOICES = ("10", "25", "50", "100", "250", "Endless") # Anything but 10 is a training drill (not on the leaderboard)
 FEEDBACK_DELAY_MS = 1200 # Delay for feedback visibility
 RETRY_FEEDBACK_DELAY_MS = 1700 # Slightly longer delay after retry/skip/timeout
 
+_score_store = None # Opened lazily by get_score_store()
+_leaderboard_cache = None # Top-K per mode, created by get_leaderboard_cache()
+_store_init_lock = threading.Lock()
+
 # ========== Color Palette (from Untitled-1.py) ==========
 COLOR_BACKGROUND = "#F0F8FF"
 COLOR_FRAME_BG = "#F0F8FF"
@@ -36,6 +55,8 @@ COLOR_EASY = "#98FB98"
 COLOR_MEDIUM = "#FFDAB9"
 COLOR_HARD = "#FFB6C1"
 COLOR_RANDOM = "#B0C4DE"
+COLOR_EXPERT = "#DDA0DD"
+COLOR_MASTER = "#E6E6FA"
 
 # Action Button Colors
 COLOR_SUBMIT = "#5F9EA0"      # Cadet Blue for Submit/Play Again
@@ -48,168 +69,230 @@ COLOR_SKIP = "#D3D3D3"      # Light Gray
 COLOR_SKIP_TEXT = "#696969"   # Dim Gray
 COLOR_SKIP_HOVER = "#C0C0C0"  # Silver
 
-# ========== Non-GUI Logic (Adapted for Difficulty Modes) ==========
-
-def get_time_limit(difficulty_mode, question_index):
-    """Calculates the time limit in seconds based on difficulty mode and question progress."""
-    if difficulty_mode == "easy":
-        base_time = 40
-        time_reduction_per_q = 1.5
-        min_time = 20
-    elif difficulty_mode == "medium":
-        base_time = 30
-        time_reduction_per_q = 1.5
-        min_time = 15
-    elif difficulty_mode == "hard":
-        base_time = 25
-        time_reduction_per_q = 1.5
-        min_time = 10
-    else: # Default to medium
-        base_time = 30
-        time_reduction_per_q = 1.5
-        min_time = 15
-    # Adjust time reduction based on TOTAL_QUESTIONS to ensure it doesn't drop too fast
-    # Example: Scale reduction based on total questions (optional, but can be smoother)
-    # time_reduction_per_q = time_reduction_per_q * (5 / TOTAL_QUESTIONS) # Scale reduction if needed
-    time_limit = base_time - (question_index - 1) * time_reduction_per_q
-    return max(min_time, int(time_limit))
-
-def generate_question_data(difficulty_mode):
-    """Generates question components based on the chosen difficulty mode."""
-    if difficulty_mode == "random":
-        actual_difficulty = random.choice(["easy", "medium", "hard"])
-    else:
-        actual_difficulty = difficulty_mode
-
-    if actual_difficulty == "easy":
-        num1, num2 = random.randint(1, 15), random.randint(1, 10)
-        op = random.choice(['+', '-'])
-        if op == '-' and num1 < num2: num1, num2 = num2, num1
-    elif actual_difficulty == "medium":
-        num1, num2 = random.randint(10, 50), random.randint(5, 30)
-        op = random.choice(['+', '-', '*'])
-        if op == '*': num1, num2 = random.randint(2, 12), random.randint(2, 10)
-    elif actual_difficulty == "hard":
-        num1, num2 = random.randint(20, 100), random.randint(10, 70)
-        op = random.choice(['+', '-', '*'])
-        if op == '*': num1, num2 = random.randint(5, 20), random.randint(5, 15)
-    else: # Fallback
-        print(f"Warning: Unknown difficulty '{actual_difficulty}', defaulting to easy.")
-        actual_difficulty = "easy"
-        num1, num2, op = 5, 3, '+'
-
-    question_str = f"{num1} {op} {num2}"
-    try:
-        answer = eval(question_str)
-    except Exception as e:
-        print(f"Error evaluating question '{question_str}': {e}")
-        return "Error", 0, actual_difficulty
-    return question_str, answer, actual_difficulty
-
-def save_score(name, score, mode):
-    """Appends score to the score file in 'Name,Score/Total (Mode)' format."""
-    try:
-        with open(SCORE_FILE, "a") as f:
-            f.write(f"{name},{score}/{TOTAL_QUESTIONS} ({mode.capitalize()})\n")
-    except IOError as e:
-        messagebox.showerror("File Error", f"Error saving score: {e}")
-
-def load_scores():
-    """Loads scores, handling 'Score/Total (Mode)' format. Returns list of (name, score_value, score_str)."""
-    scores = []
-    if not os.path.exists(SCORE_FILE): return scores
+# Summary row tags (configured once per widget)
+RESULT_TAG_COLORS = {"correct": COLOR_CORRECT, "wrong": COLOR_WRONG, "warning": COLOR_WARNING, "neutral": COLOR_TEXT}
+
+# ========== Non-GUI Logic (game rules live in engine.py, questions in questions.py) ==========
+
+def get_score_store():
+    """Returns the process-wide score store, opening it (and importing legacy scores) on first use."""
+    global _score_store
+    with _store_init_lock: # First use may come from an I/O worker and the Tk thread at once
+        if _score_store is None:
+            from scorestore import open_score_store # sqlite3 and friends load on the I/O worker, not at launch
+            _score_store = open_score_store(SCORE_BACKEND, SCORE_FILE, SCORE_DB_FILE)
+            compact_score_file() # Startup compaction of a grown text file
+    return _score_store
+
+def compact_score_file():
+    """Compacts the text score file on a background thread once enough has been appended (no-op for SQLite)."""
+    from scorestore import TextScoreStore
+    if isinstance(_score_store, TextScoreStore): _score_store.start_background_compaction()
+
+def get_leaderboard_cache():
+    """Returns the process-wide leaderboard cache sitting in front of the score store."""
+    global _leaderboard_cache
+    store = get_score_store()
+    with _store_init_lock:
+        if _leaderboard_cache is None:
+            from scorestore import LeaderboardCache
+            _leaderboard_cache = LeaderboardCache(store, LEADERBOARD_SIZE)
+    return _leaderboard_cache
+
+def record_game(session):
+    """Saves a finished game: its score (leaderboard-length games only; drills don't compete), its answer
+    latencies, and the player's stats. Runs on the I/O worker, so errors are raised (IOError) rather than
+    shown here; the GUI reports them on the Tk thread."""
+    if session.total_questions == TOTAL_QUESTIONS:
+        get_leaderboard_cache().add(session.player_name, session.score, TOTAL_QUESTIONS, session.difficulty_mode)
+        compact_score_file()
+    store = get_score_store()
+    store.add_latencies(session.latency_report())
+    store.add_player_game(session.player_name, session.difficulty_mode, session.score, session.game_stats(),
+                          ranked=session.total_questions == TOTAL_QUESTIONS)
+
+def load_latency_report():
+    """All-time answer latencies, for the I/O worker (raises IOError)."""
+    return get_score_store().latency_report()
+
+def load_player_stats(name):
+    """Loads one player's all-time stats (a keyed lookup, not a scan of the scores). Returns None on error."""
     try:
-        with open(SCORE_FILE, "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                try:
-                    name, score_part = line.strip().split(",", 1)
-                    score_part = score_part.strip()
-                    if '/' in score_part:
-                        score_val_str = score_part.split('/')[0]
-                        score_value = int(score_val_str)
-                        # Optional: Could also extract total from score_part if needed for validation
-                    else: # Handle older format or lines without '/'
-                        score_value = int(score_part.split(' ')[0])
-                    scores.append((name, score_value, score_part))
-                except (ValueError, IndexError) as e:
-                    print(f"Skipping malformed score line: {line.strip()} ({e})")
-                    continue
+        return get_score_store().player_stats(name)
     except IOError as e:
-        messagebox.showerror("File Error", f"Error reading score file: {e}")
-    except Exception as e:
-        messagebox.showerror("Error", f"An unexpected error occurred loading scores: {e}")
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
+        print(f"Error reading player stats: {e}") # Runs on every keystroke in the name field; don't pop up dialogs
+    return None
+
+def top_scores(limit=LEADERBOARD_SIZE, mode=None):
+    """Scores best first, optionally only the top `limit` (None: all) and/or one mode, as (name, score_value, score_str).
+    Served from memory for limit <= LEADERBOARD_SIZE. For the I/O worker (raises IOError)."""
+    return get_leaderboard_cache().top(limit, mode)
+
+# Summary table column widths: question, your answer, correct answer, result. Each fits its header label; the
+# question column fits the longest question any tier generates (21 for Master), the result column the longest
+# result ("⚠️ Invalid (Non-numeric)").
+SUMMARY_COLUMNS = (max_question_length(), 11, 7, 24)
+SUMMARY_WIDTH = sum(SUMMARY_COLUMNS) + len(SUMMARY_COLUMNS) - 1 # Characters per line, with single-space separators; the summary Text is this wide
+
+def summary_header_rows():
+    q_width, ua_width, ca_width, r_width = SUMMARY_COLUMNS
+    header = f"{'Question':<{q_width}} {'Your Answer':<{ua_width}} {'Correct':<{ca_width}} {'Result':<{r_width}}\n"
+    return [(header, None), ("=" * SUMMARY_WIDTH + "\n", None)]
+
+def summary_row(record):
+    """Formats one history.HistoryRecord as a (line, tag) summary row."""
+    q_width, ua_width, ca_width, r_width = SUMMARY_COLUMNS
+    q = record.question or 'N/A'
+    ua = str(record.user_answer)[:ua_width]
+    ca = str(record.correct_answer)
+    r = record.result or 'Unknown'
+    tag = "neutral"
+    r_display = r # Default display
+
+    if r == "Correct": r_display, tag = "✅ Correct", "correct"
+    elif r == "Correct (Retry)": r_display, tag = "✅ Correct (Retry)", "correct"
+    elif r == "Wrong (Retry Failed)": r_display, tag = "❌ Wrong (Retry)", "wrong"
+    elif r == "Wrong (Skipped)": r_display, tag = "❌ Wrong (Skipped)", "wrong"
+    elif r == "Timeout": r_display, tag = "⏱ Timeout", "warning"
+    elif "Invalid" in r: r_display, tag = f"⚠️ {r}", "warning"
+    elif r == "Error": r_display, tag = f"⚙️ Error", "warning"
+
+    return f"{q:<{q_width}} {ua:<{ua_width}} {ca:<{ca_width}} {r_display:<{r_width}}\n", tag
+
+def leaderboard_rows(scores):
+    """Formats (name, score_value, score_str) rows as (line, tag) leaderboard rows."""
+    if not scores:
+        return [("No scores yet! Be the first! ✨", None)]
+    medals = ['🥇', '🥈', '🥉', '🎖️', '🎖️']
+    name_width, score_width = 25, 20
+    rows = [(f"{'Rank':<6} {'Name':<{name_width}} {'Score':<{score_width}}\n", None),
+            ("="*(6 + name_width + score_width + 2) + "\n", None)]
+    for i, (name, score_val, score_str) in enumerate(scores):
+         medal_index = min(i, len(medals) - 1)
+         rows.append((f"{medals[medal_index]:<6} {name:<{name_width}} {score_str:<{score_width}}\n", None))
+    return rows
+
+def player_stats_text(stats):
+    """Formats a PlayerStats for the start screen."""
+    if not stats or not stats.games:
+        return "No games played yet."
+    lines = [f"Games: {stats.games}   Streak: {stats.streak} (best {stats.best_streak})"]
+    modes = [f"{mode.capitalize() or 'Other'} best {best}/{TOTAL_QUESTIONS} avg {mean:.1f}" for mode, games, best, mean in stats.mode_rows()]
+    for i in range(0, len(modes), 2):
+        lines.append("   ".join(modes[i:i + 2]))
+    accuracy = [f"{operator} {fraction:.0%}" for operator, answered, fraction in stats.accuracy_rows()]
+    if accuracy: lines.append("Accuracy: " + "  ".join(accuracy))
+    return "\n".join(lines)
 
 # ========== GUI Application Class ==========
 
+# Fonts, created on first use (see MindMathGUI.__getattr__), so launch only pays for the start screen's
+FONT_SPECS = {
+    "title_font": {"family": "Arial", "size": 22, "weight": "bold"},
+    "label_font": {"family": "Arial", "size": 12},
+    "button_font": {"family": "Arial", "size": 11, "weight": "bold"},
+    "question_font": {"family": "Arial", "size": 18, "weight": "bold"},
+    "feedback_font": {"family": "Arial", "size": 13, "weight": "bold"},
+    "summary_font": {"family": "Consolas", "size": 10}, # Monospaced for table
+    "leaderboard_font": {"family": "Consolas", "size": 10},
+}
+
 class MindMathGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("🧠 MindMath - Brain Trainer ✨")
-        self.root.geometry("550x750") # Increased height for summary
+        self.root.geometry("550x860") # Increased height for summary and response times
         self.root.configure(bg=COLOR_BACKGROUND)
 
-        # --- Fonts ---
-        self.title_font = font.Font(family="Arial", size=22, weight="bold")
-        self.label_font = font.Font(family="Arial", size=12)
-        self.button_font = font.Font(family="Arial", size=11, weight="bold")
-        self.question_font = font.Font(family="Arial", size=18, weight="bold")
-        self.feedback_font = font.Font(family="Arial", size=13, weight="bold")
-        self.summary_font = font.Font(family="Consolas", size=10) # Monospaced for table
-        self.leaderboard_font = font.Font(family="Consolas", size=10)
-
-        # --- Game State Variables ---
-        self.player_name = "Player"
-        self.score = 0
-        self.streak = 0
-        self.current_question_index = 0
-        self.difficulty_mode = None
-        self.correct_answer = None
-        self.question_start_time = 0
-        self.current_time_limit = 0
-        self.timer_id = None
-        self.actual_difficulty_for_random = None
-        self.current_question_str = "" # Store question for history
-        self.game_history = [] # List to store results for summary
-        self.is_retry_attempt = False # Flag for retry state
-
-        # --- Widgets ---
+        # --- Game State ---
+        self.session = None # engine.QuizSession holding all game state and rules
+        self.scheduler = TickScheduler(root) # Owns every timeout, feedback delay and countdown redraw
+        self.io = BackgroundIO(root) # Score saves and queries; the Tk thread never waits on disk
+        self._stats_request = 0 # Latest player-stats lookup; older answers arriving late are ignored
+        self.metrics = None
+        if METRICS_FILE: self._enable_metrics()
+
+        # --- Widgets (game and end screens are built on first use, then reused) ---
         self.start_frame = tk.Frame(root, bg=COLOR_FRAME_BG)
-        self.game_frame = tk.Frame(root, bg=COLOR_FRAME_BG)
-        self.end_frame = tk.Frame(root, bg=COLOR_FRAME_BG)
+        self.game_frame = None
+        self.end_frame = None
+        self.leaderboard_popup = None # Built on first use, then hidden and shown
 
         self._create_start_widgets()
-        self._create_game_widgets()
-        self._create_end_widgets()
 
         self.show_frame(self.start_frame)
+        self.root.after_idle(self.show_player_stats) # Starts the I/O worker once the first screen is up
+
+    def _enable_metrics(self):
+        from metrics import Metrics, METRICS_EXPORT_S
+        self.metrics = Metrics(METRICS_FILE)
+        self.scheduler.metrics = self.io.metrics = self.metrics
+        self.metrics.instrument(self, TIMED_METHODS, "gui.") # Before any widget or timer captures a bound method
+
+        def export():
+            try:
+                self.metrics.export()
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+            self.root.after(METRICS_EXPORT_S * 1000, export) # Not on self.scheduler: cancel_all() runs on every question
+        self.root.after(METRICS_EXPORT_S * 1000, export)
+
+    def __getattr__(self, name):
+        """Creates a FONT_SPECS font the first time it is used."""
+        if name not in FONT_SPECS:
+            raise AttributeError(name)
+        value = font.Font(**FONT_SPECS[name])
+        setattr(self, name, value)
+        return value
 
     # --- Screen Management ---
     def show_frame(self, frame_to_show):
-        self.start_frame.pack_forget()
-        self.game_frame.pack_forget()
-        self.end_frame.pack_forget()
+        for frame in (self.start_frame, self.game_frame, self.end_frame):
+            if frame is not None: frame.pack_forget()
         frame_to_show.pack(fill="both", expand=True, padx=30, pady=30)
 
+    def build_game_frame(self):
+        if self.game_frame is None:
+            self.game_frame = tk.Frame(self.root, bg=COLOR_FRAME_BG)
+            self._create_game_widgets()
+        return self.game_frame
+
+    def build_end_frame(self):
+        if self.end_frame is None:
+            self.end_frame = tk.Frame(self.root, bg=COLOR_FRAME_BG)
+            self._create_end_widgets()
+        return self.end_frame
+
     # --- Widget Creation ---
     def _create_start_widgets(self):
         tk.Label(self.start_frame, text="Welcome to MindMath!", font=self.title_font, bg=COLOR_FRAME_BG, fg=COLOR_TITLE).pack(pady=(10, 25))
         tk.Label(self.start_frame, text="Enter your name:", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(pady=5)
         self.name_entry = tk.Entry(self.start_frame, font=self.label_font, width=25, bg=COLOR_ENTRY_BG, fg=COLOR_ENTRY_FG, relief="solid", borderwidth=1, justify='center')
-        self.name_entry.pack(pady=(0, 15))
+        self.name_entry.pack(pady=(0, 5))
         self.name_entry.insert(0, "Player")
+        self.name_entry.bind("<KeyRelease>", lambda event: self.show_player_stats())
+        self.player_stats_label = tk.Label(self.start_frame, text="", font=self.leaderboard_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT, justify=tk.LEFT)
+        self.player_stats_label.pack(pady=(0, 10))
 
         tk.Label(self.start_frame, text="Choose Difficulty:", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(pady=(15, 10))
         difficulty_frame = tk.Frame(self.start_frame, bg=COLOR_FRAME_BG)
         difficulty_frame.pack(pady=5)
+
+        length_frame = tk.Frame(self.start_frame, bg=COLOR_FRAME_BG)
+        length_frame.pack(pady=(10, 0))
+        tk.Label(length_frame, text="Questions:", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(side=tk.LEFT, padx=5)
+        self.question_count_var = tk.StringVar(value=str(TOTAL_QUESTIONS))
+        length_menu = tk.OptionMenu(length_frame, self.question_count_var, *QUESTION_COUNT_CHOICES)
+        length_menu.config(font=self.label_font, bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT, activebackground=COLOR_BUTTON_HOVER, relief="raised", borderwidth=1)
+        length_menu.pack(side=tk.LEFT)
         button_opts = {'font': self.button_font, 'width': 12, 'pady': 5, 'relief': "raised", 'borderwidth': 2}
         hover_opts = {'activebackground': COLOR_BUTTON_HOVER, 'activeforeground': COLOR_BUTTON_TEXT}
         tk.Button(difficulty_frame, text="Easy 🌱", command=lambda: self.set_difficulty_and_start("easy"), bg=COLOR_EASY, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=0, column=0, padx=10, pady=8)
         tk.Button(difficulty_frame, text="Medium 🔥", command=lambda: self.set_difficulty_and_start("medium"), bg=COLOR_MEDIUM, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=0, column=1, padx=10, pady=8)
         tk.Button(difficulty_frame, text="Hard 🚀", command=lambda: self.set_difficulty_and_start("hard"), bg=COLOR_HARD, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=1, column=0, padx=10, pady=8)
         tk.Button(difficulty_frame, text="Random ✨", command=lambda: self.set_difficulty_and_start("random"), bg=COLOR_RANDOM, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=1, column=1, padx=10, pady=8)
+        tk.Button(difficulty_frame, text="Expert 🧩", command=lambda: self.set_difficulty_and_start("expert"), bg=COLOR_EXPERT, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=2, column=0, padx=10, pady=8)
+        tk.Button(difficulty_frame, text="Master 🧠", command=lambda: self.set_difficulty_and_start("master"), bg=COLOR_MASTER, fg=COLOR_BUTTON_TEXT, **button_opts, **hover_opts).grid(row=2, column=1, padx=10, pady=8)
 
         tk.Frame(self.start_frame, height=30, bg=COLOR_FRAME_BG).pack() # Spacer
         tk.Button(self.start_frame, text="🏆 Show Leaderboard", font=self.button_font, command=self.show_leaderboard_popup, width=20, pady=5, bg=COLOR_BUTTON, fg=COLOR_BUTTON_TEXT, activebackground=COLOR_BUTTON_HOVER, activeforeground=COLOR_BUTTON_TEXT, relief="raised", borderwidth=2).pack(pady=8)
@@ -247,7 +330,11 @@ class MindMathGUI:
         self.feedback_label = tk.Label(self.game_frame, text="", font=self.feedback_font, bg=COLOR_FRAME_BG, height=2, wraplength=450)
         self.feedback_label.pack(pady=15) # Reduced padding
 
+        # Finish button for drills (shown only when the game isn't a standard TOTAL_QUESTIONS game)
+        self.finish_button = tk.Button(self.game_frame, text="🏁 End Drill", font=self.button_font, command=self.finish_drill, width=15, pady=3, bg=COLOR_SKIP, fg=COLOR_SKIP_TEXT, activebackground=COLOR_SKIP_HOVER, activeforeground=COLOR_SKIP_TEXT, relief="raised", borderwidth=2)
+
     def _create_end_widgets(self):
+        from tkinter import scrolledtext
         tk.Label(self.end_frame, text="🎯 Quiz Over! 🎯", font=self.title_font, bg=COLOR_FRAME_BG, fg=COLOR_TITLE).pack(pady=(10, 10))
         self.mode_played_label = tk.Label(self.end_frame, text="Mode Played: ", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT)
         self.mode_played_label.pack(pady=3)
@@ -257,11 +344,17 @@ class MindMathGUI:
         # --- Game Summary Section ---
         tk.Label(self.end_frame, text="📊 Game Summary:", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(pady=(10, 5))
         # <<< MODIFIED: Increased height slightly for more questions
-        self.summary_text = scrolledtext.ScrolledText(self.end_frame, height=12, width=65, font=self.summary_font, relief="solid", borderwidth=1, bg=COLOR_SUMMARY_BG, fg=COLOR_TEXT, wrap=tk.WORD)
-        self.summary_text.pack(pady=5)
-        self.summary_text.config(state=tk.DISABLED)
+        # Virtualized: only the rows in view are formatted and inserted, however long the game was
+        self.summary_view = create_virtual_text(self.end_frame, bg=COLOR_SUMMARY_BG, height=12, width=SUMMARY_WIDTH, font=self.summary_font, relief="solid", borderwidth=1, fg=COLOR_TEXT, state=tk.DISABLED)
+        configure_tags(self.summary_view.text, RESULT_TAG_COLORS)
+        self.summary_view.frame.pack(pady=5)
         # --- End Game Summary Section ---
 
+        tk.Label(self.end_frame, text="⏱ Response Times (all games):", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(pady=(10, 5))
+        self.latency_text = scrolledtext.ScrolledText(self.end_frame, height=5, width=65, font=self.summary_font, relief="solid", borderwidth=1, bg=COLOR_SUMMARY_BG, fg=COLOR_TEXT, wrap=tk.NONE)
+        self.latency_text.pack(pady=5)
+        self.latency_text.config(state=tk.DISABLED)
+
         tk.Label(self.end_frame, text="🏆 Leaderboard (Top 5):", font=self.label_font, bg=COLOR_FRAME_BG, fg=COLOR_TEXT).pack(pady=(15, 5))
         self.leaderboard_text = scrolledtext.ScrolledText(self.end_frame, height=7, width=65, font=self.leaderboard_font, relief="solid", borderwidth=1, bg=COLOR_LEADERBOARD_BG, fg=COLOR_TEXT, wrap=tk.NONE) # Changed to ScrolledText
         self.leaderboard_text.pack(pady=5)
@@ -276,21 +369,26 @@ class MindMathGUI:
 
     def set_difficulty_and_start(self, mode):
         """Sets the chosen difficulty and starts the game."""
-        name = self.name_entry.get().strip()
-        self.player_name = name if name else "Player"
-        self.difficulty_mode = mode
-        self.score = 0
-        self.streak = 0
-        self.current_question_index = 0
-        self.game_history = [] # Reset history for new game
-        self.is_retry_attempt = False # Ensure reset
-        self.mode_label.config(text=f"Mode: {self.difficulty_mode.capitalize()}")
+        self.build_game_frame()
+        if self.session: self.session.close() # Drop the previous game's session log
+        count = self.question_count_var.get()
+        total = None if count == "Endless" else int(count)
+        recorder = None
+        if RECORD_FILE:
+            from replay import SessionRecorder
+            recorder = SessionRecorder()
+        self.session = QuizSession(self.name_entry.get().strip(), mode, total_questions=total, clock=self.scheduler.clock, recorder=recorder)
+        if total == TOTAL_QUESTIONS:
+            self.finish_button.pack_forget()
+        else:
+            self.finish_button.pack(side=tk.BOTTOM, pady=10)
+        self.mode_label.config(text=f"Mode: {mode.capitalize()}")
         self.show_frame(self.game_frame)
         self.next_question()
 
     def next_question(self):
+        self.scheduler.cancel_all() # Nothing from the previous question may fire any more
         # Reset UI for new question
-        self.is_retry_attempt = False # Ensure retry flag is off
         self.timer_label.config(text="")
         self.feedback_label.config(text="", fg=COLOR_TEXT)
         self.answer_entry.delete(0, tk.END)
@@ -299,132 +397,75 @@ class MindMathGUI:
         self.submit_button.config(state=tk.NORMAL)
         self.retry_frame.pack_forget() # Ensure retry/skip is hidden
 
-        if self.current_question_index >= TOTAL_QUESTIONS:
+        question_str = self.session.next_question()
+        if question_str is None:
             self.end_game()
             return
 
-        self.current_question_index += 1
-
-        # Generate question data
-        question_str, self.correct_answer, self.actual_difficulty_for_random = generate_question_data(self.difficulty_mode)
-        self.current_question_str = question_str # Store for history
-
-        if question_str == "Error":
-             messagebox.showerror("Error", "Could not generate question. Skipping.")
-             self.record_history("N/A", "Error") # Record error in history
-             self.root.after(100, self.next_question)
-             return
-
-        # Get dynamic time limit
-        difficulty_for_timer = self.difficulty_mode if self.difficulty_mode != "random" else self.actual_difficulty_for_random
-        self.current_time_limit = get_time_limit(difficulty_for_timer, self.current_question_index)
-
         # Update UI labels
-        self.progress_label.config(text=f"Q: {self.current_question_index}/{TOTAL_QUESTIONS}")
-        mode_display = self.difficulty_mode.capitalize()
-        if self.difficulty_mode == "random":
-             mode_display = f"Random ({self.actual_difficulty_for_random.capitalize()})"
-        self.mode_label.config(text=f"Mode: {mode_display}")
+        total_display = "∞" if self.session.is_endless else self.session.total_questions
+        self.progress_label.config(text=f"Q: {self.session.current_question_index}/{total_display}")
+        self.mode_label.config(text=f"Mode: {self.session.mode_display()}")
         self.question_label.config(text=f"🧮 Solve: {question_str} = ?")
 
         self.answer_entry.focus_set()
-        self.question_start_time = time.time()
-        self.update_timer()
-
-        # Start timer
-        if self.timer_id: self.root.after_cancel(self.timer_id)
-        self.timer_id = self.root.after(self.current_time_limit * 1000, self.timeout)
-
-    def update_timer(self):
-        if not self.game_frame.winfo_ismapped() or (self.answer_entry.cget('state') == tk.DISABLED and self.timer_label.cget('text') != "⏱ Time's Up!"):
-             if self.timer_label.cget('text') != "⏱ Time's Up!": self.timer_label.config(text="")
-             return
-        elapsed = time.time() - self.question_start_time
-        remaining = max(0, self.current_time_limit - int(elapsed))
+
+        # Start timer: one deadline for the timeout, countdown redraws on whole-second boundaries
+        session = self.session
+        Countdown(self.scheduler, session.question_start_time, session.current_time_limit, self.draw_timer) # Lives on in its scheduled ticks
+        self.scheduler.call_at(session.question_start_time + session.current_time_limit, self.timeout)
+
+    def draw_timer(self, remaining):
         self.timer_label.config(text=f"⏱ {remaining}s")
-        if remaining > 0 and (self.answer_entry.cget('state') == tk.NORMAL or self.retry_frame.winfo_ismapped()): # Check retry frame too
-             self.root.after(1000, self.update_timer)
 
     def timeout(self):
-        if not self.game_frame.winfo_ismapped() or (self.answer_entry.cget('state') == tk.DISABLED and not self.retry_frame.winfo_ismapped()):
-            return
-        if self.timer_id: self.root.after_cancel(self.timer_id); self.timer_id = None
+        outcome = self.session.timeout() if self.session else None
+        if outcome is None: return # Question already answered
+        self.scheduler.cancel_all()
 
-        self.feedback_label.config(text=f"⏱ Time's up! Answer was: {self.correct_answer}", fg=COLOR_WARNING)
-        self.streak = 0
+        self.feedback_label.config(text=f"⏱ Time's up! Answer was: {outcome.correct_answer}", fg=COLOR_WARNING)
         self.answer_entry.config(state=tk.DISABLED)
         self.submit_button.pack_forget() # Hide submit
         self.retry_frame.pack_forget() # Hide retry/skip
         self.timer_label.config(text="⏱ Time's Up!")
-        self.is_retry_attempt = False # Cannot retry timeout
-
-        self.record_history("Timeout", "Timeout") # Record timeout
-        self.root.after(RETRY_FEEDBACK_DELAY_MS, self.next_question) # Use longer delay
+        self.scheduler.call_later(RETRY_FEEDBACK_DELAY_MS / 1000, self.next_question) # Use longer delay
 
     def submit_answer_event(self, event):
         if self.submit_button.winfo_ismapped() and self.submit_button.cget('state') == tk.NORMAL:
             self.submit_answer()
 
     def submit_answer(self):
-        if self.timer_id: self.root.after_cancel(self.timer_id); self.timer_id = None
+        if not self.session.awaiting_answer: return
+        self.scheduler.cancel_all() # Stops the timeout and the countdown
         self.timer_label.config(text="")
         self.answer_entry.config(state=tk.DISABLED)
         self.submit_button.config(state=tk.DISABLED) # Disable submit during processing
 
-        user_answer_str = self.answer_entry.get().strip()
-        final_result_str = ""
-
-        try:
-            if not user_answer_str:
-                 self.feedback_label.config(text="❌ Please enter an answer.", fg=COLOR_WRONG)
-                 self.streak = 0
-                 final_result_str = "Invalid (Empty)"
-                 self.record_history(user_answer_str, final_result_str)
-                 self.root.after(FEEDBACK_DELAY_MS, self.next_question)
-                 return
-
-            user_answer = int(user_answer_str)
-
-            if user_answer == self.correct_answer:
-                if self.is_retry_attempt:
-                    self.feedback_label.config(text=f"✅ Correct on Retry! 😎", fg=COLOR_CORRECT)
-                    final_result_str = "Correct (Retry)"
-                    # No score/streak increase on retry
-                else:
-                    self.feedback_label.config(text="✅ Correct! Great job! ✨", fg=COLOR_CORRECT)
-                    self.score += 1
-                    self.streak += 1
-                    final_result_str = "Correct"
-                self.record_history(user_answer_str, final_result_str)
-                self.is_retry_attempt = False # Reset flag
-                self.root.after(FEEDBACK_DELAY_MS, self.next_question)
-
-            else: # Wrong Answer
-                self.streak = 0
-                if self.is_retry_attempt: # Failed the retry
-                    self.feedback_label.config(text=f"❌ Still incorrect. Answer was: {self.correct_answer}", fg=COLOR_WRONG)
-                    final_result_str = "Wrong (Retry Failed)"
-                    self.record_history(user_answer_str, final_result_str)
-                    self.is_retry_attempt = False
-                    self.submit_button.pack_forget() # Hide submit after failed retry
-                    self.root.after(RETRY_FEEDBACK_DELAY_MS, self.next_question)
-                else: # First wrong answer - Offer Retry
-                    self.feedback_label.config(text="❌ Oops! Not quite. Try again?", fg=COLOR_WARNING)
-                    # Don't record history yet, wait for retry/skip outcome
-                    self.submit_button.pack_forget() # Hide Submit
-                    self.retry_frame.pack(pady=10) # Show Retry/Skip
-
-        except ValueError:
+        outcome = self.session.submit(self.answer_entry.get())
+        result = outcome.result
+        if result == "Correct":
+            self.feedback_label.config(text="✅ Correct! Great job! ✨", fg=COLOR_CORRECT)
+        elif result == "Correct (Retry)":
+            self.feedback_label.config(text=f"✅ Correct on Retry! 😎", fg=COLOR_CORRECT)
+        elif result == "Wrong (Retry Failed)":
+            self.feedback_label.config(text=f"❌ Still incorrect. Answer was: {outcome.correct_answer}", fg=COLOR_WRONG)
+            self.submit_button.pack_forget() # Hide submit after failed retry
+        elif result == "Retry Offered": # First wrong answer
+            self.feedback_label.config(text="❌ Oops! Not quite. Try again?", fg=COLOR_WARNING)
+            self.submit_button.pack_forget() # Hide Submit
+            self.retry_frame.pack(pady=10) # Show Retry/Skip
+        elif result == "Invalid (Empty)":
+            self.feedback_label.config(text="❌ Please enter an answer.", fg=COLOR_WRONG)
+        else: # Invalid (Non-numeric)
             self.feedback_label.config(text="❌ Invalid input! Enter numbers only.", fg=COLOR_WRONG)
-            self.streak = 0
-            final_result_str = "Invalid (Non-numeric)"
-            self.record_history(user_answer_str, final_result_str)
-            self.is_retry_attempt = False # Cannot retry invalid input
-            self.root.after(FEEDBACK_DELAY_MS, self.next_question)
+
+        if outcome.done:
+            delay_ms = RETRY_FEEDBACK_DELAY_MS if result in LONG_FEEDBACK_RESULTS else FEEDBACK_DELAY_MS
+            self.scheduler.call_later(delay_ms / 1000, self.next_question)
 
     # --- Retry/Skip Handlers ---
     def handle_retry(self):
-        self.is_retry_attempt = True
+        self.session.retry()
         self.retry_frame.pack_forget() # Hide retry/skip
         self.submit_button.pack(pady=10) # Show submit again
         self.submit_button.config(state=tk.NORMAL)
@@ -435,111 +476,171 @@ class MindMathGUI:
         # Timer does not restart
 
     def skip_retry(self):
+        outcome = self.session.skip()
         self.retry_frame.pack_forget() # Hide retry/skip
-        self.feedback_label.config(text=f"❌ Skipped. Answer was: {self.correct_answer}", fg=COLOR_WRONG)
-        self.record_history("Skipped", "Wrong (Skipped)") # Record skip
-        self.is_retry_attempt = False
-        self.root.after(RETRY_FEEDBACK_DELAY_MS, self.next_question) # Longer delay
+        self.feedback_label.config(text=f"❌ Skipped. Answer was: {outcome.correct_answer}", fg=COLOR_WRONG)
+        self.scheduler.call_later(RETRY_FEEDBACK_DELAY_MS / 1000, self.next_question) # Longer delay
 
     # --- History and Summary ---
-    def record_history(self, user_answer_display, result):
-        """Adds the details of the completed question to the game history."""
-        history_entry = {
-            "question": self.current_question_str,
-            "user_answer": user_answer_display, # Store string representation
-            "correct_answer": self.correct_answer,
-            "result": result # e.g., "Correct", "Wrong (Retry Failed)", "Timeout"
-        }
-        self.game_history.append(history_entry)
-
-    def display_game_summary(self, text_widget):
-        """Formats and displays the game history in the summary Text widget."""
-        text_widget.config(state=tk.NORMAL)
-        text_widget.delete('1.0', tk.END)
-
-        if not self.game_history:
-            text_widget.insert(tk.END, "No game history recorded.")
-        else:
-            q_width, ua_width, ca_width, r_width = 18, 18, 12, 22
-            total_width = q_width + ua_width + ca_width + r_width + 3
-            header = f"{'Question':<{q_width}} {'Your Answer':<{ua_width}} {'Correct':<{ca_width}} {'Result':<{r_width}}\n"
-            separator = "=" * total_width + "\n"
-            text_widget.insert(tk.END, header)
-            text_widget.insert(tk.END, separator)
-
-            text_widget.tag_configure("correct", foreground=COLOR_CORRECT)
-            text_widget.tag_configure("wrong", foreground=COLOR_WRONG)
-            text_widget.tag_configure("warning", foreground=COLOR_WARNING)
-            text_widget.tag_configure("neutral", foreground=COLOR_TEXT)
-
-            for entry in self.game_history:
-                q = entry.get('question', 'N/A')
-                ua = str(entry.get('user_answer', 'N/A'))
-                ca = str(entry.get('correct_answer', 'N/A'))
-                r = entry.get('result', 'Unknown')
-                tag = "neutral"
-                r_display = r # Default display
-
-                if r == "Correct": r_display, tag = "✅ Correct", "correct"
-                elif r == "Correct (Retry)": r_display, tag = "✅ Correct (Retry)", "correct"
-                elif r == "Wrong (Retry Failed)": r_display, tag = "❌ Wrong (Retry)", "wrong"
-                elif r == "Wrong (Skipped)": r_display, tag = "❌ Wrong (Skipped)", "wrong"
-                elif r == "Timeout": r_display, tag = "⏱ Timeout", "warning"
-                elif "Invalid" in r: r_display, tag = f"⚠️ {r}", "warning"
-                elif r == "Error": r_display, tag = f"⚙️ Error", "warning"
-
-                line = f"{q:<{q_width}} {ua:<{ua_width}} {ca:<{ca_width}} {r_display:<{r_width}}\n"
-                text_widget.insert(tk.END, line, (tag,))
-
-        text_widget.config(state=tk.DISABLED)
-
-    def end_game(self):
-        if self.timer_id: self.root.after_cancel(self.timer_id); self.timer_id = None
-        save_score(self.player_name, self.score, self.difficulty_mode)
-        self.mode_played_label.config(text=f"Mode Played: {self.difficulty_mode.capitalize()}")
-        self.final_score_label.config(text=f"Your final score: {self.score}/{TOTAL_QUESTIONS}")
+    def display_game_summary(self, summary_view):
+        """Displays the game history in the (virtualized) summary view."""
+        history = self.session.history if self.session else []
+        if not history:
+            summary_view.show_message("No game history recorded.")
+            return
+        # Rows are read lazily (from the session log for long drills) as they scroll into view
+        summary_view.show(summary_header_rows(), len(history), lambda start, stop: [summary_row(record) for record in history.rows(start, stop)])
 
-        self.display_game_summary(self.summary_text) # Display summary
-        self.display_leaderboard(self.leaderboard_text)
+    def display_latency_report(self, text_widget, report):
+        """Shows p50/p90/p99 answer latency per operator and per difficulty from the streaming histograms."""
+        if not any(report.histograms.values()):
+            replace_text(text_widget, [("No answers timed yet.", None)])
+            return
+        key_width, col_width = 16, 9
+        rows = [(f"{'':<{key_width}} {'Answers':>{col_width}} {'p50':>{col_width}} {'p90':>{col_width}} {'p99':>{col_width}}\n", None)]
+        for dimension, title in (("operator", "Operator"), ("difficulty", "Difficulty")):
+            for key, count, *percentiles in report.rows(dimension):
+                cells = " ".join(f"{p:>{col_width - 1}.1f}s" for p in percentiles)
+                rows.append((f"{f'{title} {key}':<{key_width}} {count:>{col_width}} {cells}\n", None))
+        replace_text(text_widget, rows)
+
+    def finish_drill(self):
+        """Ends a drill early; the question on screen is not counted."""
+        self.session.finish()
+        self.end_game()
 
+    def end_game(self):
+        self.scheduler.cancel_all()
+        self.build_end_frame()
+        session = self.session
+        self.mode_played_label.config(text=f"Mode Played: {session.difficulty_mode.capitalize()}")
+        self.final_score_label.config(text=f"Your final score: {session.score}/{session.questions_answered}")
+
+        self.display_game_summary(self.summary_view) # Display summary
+        replace_text(self.latency_text, [("Loading response times...", None)])
+        replace_text(self.leaderboard_text, [("Loading leaderboard...", None)])
         self.show_frame(self.end_frame)
 
-    def display_leaderboard(self, text_widget):
-        """Formats and displays the leaderboard in the provided Text widget."""
-        scores = load_scores()
-        text_widget.config(state=tk.NORMAL)
-        text_widget.delete('1.0', tk.END)
-        if not scores:
-            text_widget.insert(tk.END, "No scores yet! Be the first! ✨")
-        else:
-            medals = ['🥇', '🥈', '🥉', '🎖️', '🎖️']
-            name_width, score_width = 25, 20
-            text_widget.insert(tk.END, f"{'Rank':<6} {'Name':<{name_width}} {'Score':<{score_width}}\n")
-            text_widget.insert(tk.END, "="*(6 + name_width + score_width + 2) + "\n")
-            for i, (name, score_val, score_str) in enumerate(scores[:5]):
-                 medal_index = min(i, len(medals) - 1)
-                 line = f"{medals[medal_index]:<6} {name:<{name_width}} {score_str:<{score_width}}\n"
-                 text_widget.insert(tk.END, line)
-        text_widget.config(state=tk.DISABLED)
-
-    def show_leaderboard_popup(self):
-        popup = tk.Toplevel(self.root)
+        # The single I/O worker runs jobs in order, so the queries below see this game's score
+        self.io.submit(record_game, session, on_error=self.io_error("Error saving score"))
+        if session.recorder:
+            from replay import append_record
+            self.io.submit(append_record, RECORD_FILE, session, on_error=self.io_error("Error saving game record"))
+        self.io.submit(load_latency_report, on_done=lambda report: self.display_latency_report(self.latency_text, report),
+                       on_error=self.io_error("Error reading response times"))
+        self.refresh_leaderboard(self.leaderboard_text)
+
+    def io_error(self, message):
+        """on_error callback for self.io jobs: shows the error in a dialog (on the Tk thread)."""
+        return lambda error: messagebox.showerror("File Error", f"{message}: {error}")
+
+    def refresh_leaderboard(self, text_widget):
+        """Queries the leaderboard on the I/O worker and displays it when it arrives."""
+        def show(scores):
+            if text_widget.winfo_exists(): self.display_leaderboard(text_widget, scores) # The window may be gone if the app is closing
+        self.io.submit(top_scores, on_done=show, on_error=self.io_error("Error reading score file"))
+
+    def display_leaderboard(self, text_widget, scores):
+        """Formats and displays the leaderboard in the provided Text widget, rewriting only the rows that changed."""
+        update_rows(text_widget, leaderboard_rows(scores))
+
+    def build_leaderboard_popup(self):
+        if self.leaderboard_popup is not None: return self.leaderboard_popup
+        from tkinter import scrolledtext
+        popup = self.leaderboard_popup = tk.Toplevel(self.root)
         popup.title("🏆 Leaderboard")
         popup.geometry("450x300")
         popup.configure(bg=COLOR_BACKGROUND)
         tk.Label(popup, text="🏆 Leaderboard (Top 5) 🏆", font=self.label_font, bg=COLOR_BACKGROUND, fg=COLOR_TITLE).pack(pady=15)
-        lb_text = scrolledtext.ScrolledText(popup, height=8, width=55, font=self.leaderboard_font, relief="solid", borderwidth=1, bg=COLOR_LEADERBOARD_BG, fg=COLOR_TEXT, wrap=tk.NONE)
-        lb_text.pack(pady=5, padx=15)
-        self.display_leaderboard(lb_text)
-        tk.Button(popup, text="Close", font=self.button_font, command=popup.destroy, width=10, pady=3, bg=COLOR_QUIT, fg=COLOR_QUIT_TEXT, activebackground=COLOR_QUIT_HOVER, activeforeground=COLOR_QUIT_TEXT, relief="raised", borderwidth=2).pack(pady=15)
-        popup.transient(self.root); popup.grab_set(); self.root.wait_window(popup)
+        self.popup_leaderboard_text = scrolledtext.ScrolledText(popup, height=8, width=55, font=self.leaderboard_font, relief="solid", borderwidth=1, bg=COLOR_LEADERBOARD_BG, fg=COLOR_TEXT, wrap=tk.NONE)
+        self.popup_leaderboard_text.pack(pady=5, padx=15)
+        replace_text(self.popup_leaderboard_text, [("Loading leaderboard...", None)])
+        tk.Button(popup, text="Close", font=self.button_font, command=self.hide_leaderboard_popup, width=10, pady=3, bg=COLOR_QUIT, fg=COLOR_QUIT_TEXT, activebackground=COLOR_QUIT_HOVER, activeforeground=COLOR_QUIT_TEXT, relief="raised", borderwidth=2).pack(pady=15)
+        popup.protocol("WM_DELETE_WINDOW", self.hide_leaderboard_popup) # Closing the window only hides it
+        popup.transient(self.root)
+        return popup
+
+    def show_leaderboard_popup(self):
+        """Shows the leaderboard window (built once, then reused) and refreshes it in the background.
+
+        The rows shown last time stay up until the refresh arrives; only rows whose scores changed are redrawn.
+        """
+        popup = self.build_leaderboard_popup()
+        popup.deiconify()
+        popup.lift()
+        popup.grab_set() # Modal while open, as before, but without a nested event loop
+        self.refresh_leaderboard(self.popup_leaderboard_text)
+
+    def hide_leaderboard_popup(self):
+        self.leaderboard_popup.grab_release()
+        self.leaderboard_popup.withdraw()
+
+    def show_player_stats(self):
+        """Shows the stats of the player named in the entry (one keyed lookup per keystroke, on the I/O worker)."""
+        self._stats_request += 1
+        request = self._stats_request
+
+        def show(stats):
+            if request == self._stats_request: self.player_stats_label.config(text=player_stats_text(stats))
+        self.io.submit(load_player_stats, self.name_entry.get().strip() or "Player", on_done=show)
 
     def play_again(self):
+        self.show_player_stats()
         self.show_frame(self.start_frame)
 
 # ========== Main Execution ==========
 
+def run_startup_timing(output_path=None):
+    """--startup-timing[=file.jsonl]: starts the GUI, prints how long each launch stage took and exits once
+    the start screen has been painted; with a file, also appends the run as one JSON line for tracking.
+
+    Times count from the start of main.py's imports. Interpreter start-up comes before that; time the whole
+    command (e.g. `time python main.py --startup-timing`) to include it.
+    """
+    import json, platform, sys
+    marks = {"imports": IMPORTS_DONE - STARTUP_START}
+    root = tk.Tk()
+    marks["tk_root"] = time.perf_counter() - STARTUP_START
+    app = MindMathGUI(root)
+    marks["gui_built"] = time.perf_counter() - STARTUP_START
+
+    def painted():
+        root.update_idletasks() # Flush the redraws queued when the start screen was mapped
+        marks["first_paint"] = time.perf_counter() - STARTUP_START
+        root.quit()
+
+    app.start_frame.bind("<Map>", lambda event: root.after_idle(painted))
+    root.mainloop()
+    result = {"time": time.time(), "python": sys.version.split()[0], "platform": platform.platform(), "marks_s": marks,
+              "modules_loaded": len(sys.modules), "screens_built": [name for name in ("game_frame", "end_frame") if getattr(app, name) is not None]}
+    app.io.shutdown()
+    root.destroy()
+    if _score_store is not None: _score_store.close()
+
+    previous = 0
+    print(f"{'Stage':<12} {'Since start':>12} {'Step':>10}")
+    for stage, elapsed in marks.items():
+        print(f"{stage:<12} {elapsed * 1000:>10.1f}ms {(elapsed - previous) * 1000:>8.1f}ms")
+        previous = elapsed
+    print(f"{result['modules_loaded']} modules loaded; screens built besides start: {', '.join(result['screens_built']) or 'none'}")
+    if output_path:
+        with open(output_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
 if __name__ == "__main__":
+    import sys
+    if "--server" in sys.argv: # Headless multi-session mode: python main.py --server [--port N ...]
+        import server
+        server.main([arg for arg in sys.argv[1:] if arg != "--server"])
+        sys.exit()
+    timing_args = [arg for arg in sys.argv[1:] if arg.startswith("--startup-timing")]
+    if timing_args: # python main.py --startup-timing[=startup.jsonl]
+        run_startup_timing(timing_args[0].partition("=")[2] or None)
+        sys.exit()
     root = tk.Tk()
     app = MindMathGUI(root)
     root.mainloop()
+    app.io.shutdown() # Let a score that is still being saved reach the disk
+    if app.session: app.session.close()
+    if _score_store is not None: _score_store.close()
+    if app.metrics: app.metrics.export()
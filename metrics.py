@@ -0,0 +1,79 @@
+# metrics.py - Opt-in counters and latency histograms for the GUI's event loop, hot paths and score I/O (no Tk imports)
+#
+# Nothing here runs unless a Metrics object is created (main.py does so when MINDMATH_METRICS_FILE is set):
+# instrumented methods are wrapped on that one instance, and the scheduler and I/O pool only test an
+# attribute for None, so the cost when turned off is a single comparison per timer tick or I/O job.
+
+import functools
+import json
+import os
+import threading
+import time
+from stats import REPORT_PERCENTILES, LatencyHistogram
+
+METRICS_EXPORT_S = 30 # How often the GUI rewrites the metrics file while running
+
+class Metrics:
+    """Named counters and log-bucketed duration histograms (see stats.LatencyHistogram), exported as JSON.
+
+    Names are dotted by area: 'after_late.<callback>' is how late a timer callback ran versus its deadline,
+    'gui.<method>' how long a GUI method took, 'io.<job>' how long a score-store job took on the I/O worker.
+    Safe to update from the I/O worker thread.
+    """
+
+    def __init__(self, path, clock=time.perf_counter):
+        self.path = path
+        self.clock = clock
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {} # name -> LatencyHistogram
+        self.maxima = {} # name -> longest observation, seconds (the histogram only keeps buckets)
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        seconds = max(0.0, seconds)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None: histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(seconds)
+            if seconds > self.maxima.get(name, 0.0): self.maxima[name] = seconds
+
+    def timed(self, name, fn):
+        """fn wrapped to record each call's duration under `name` (recorded even if it raises)."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = self.clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(name, self.clock() - start)
+        return wrapper
+
+    def instrument(self, obj, method_names, prefix):
+        """Replaces the named methods on this one instance with timed versions; the class is untouched."""
+        for method_name in method_names:
+            setattr(obj, method_name, self.timed(prefix + method_name, getattr(obj, method_name)))
+
+    def snapshot(self):
+        """Counters, plus count / max / percentiles (milliseconds) and raw buckets for every histogram."""
+        with self._lock:
+            histograms = {}
+            for name, histogram in sorted(self.histograms.items()):
+                summary = {"count": histogram.total, "max_ms": round(self.maxima[name] * 1000, 3)}
+                for p in REPORT_PERCENTILES:
+                    summary[f"p{p}_ms"] = round(histogram.percentile(p) * 1000, 3)
+                summary["buckets"] = {str(bucket): count for bucket, count in sorted(histogram.counts.items())}
+                histograms[name] = summary
+            return {"started": self.started, "exported": time.time(), "counters": dict(sorted(self.counters.items())),
+                    "histograms": histograms}
+
+    def export(self):
+        """Rewrites the metrics file with a fresh snapshot (temp file + rename, so readers never see half a file)."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,155 @@
+# questions.py - Question generation for MindMath (no Tk imports, no eval)
+
+import operator
+import random
+from array import array
+from expressions import EXPRESSION_TIERS, generate_expression, max_expression_length
+
+DIFFICULTY_LEVELS = ("easy", "medium", "hard")
+OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul}
+
+# Operand ranges per difficulty. Multiplication uses its own (smaller) ranges.
+QUESTION_SPECS = {
+    "easy":   {"ops": ('+', '-'),      "num1": (1, 15),  "num2": (1, 10), "mul1": None,    "mul2": None,    "no_negative": True},
+    "medium": {"ops": ('+', '-', '*'), "num1": (10, 50), "num2": (5, 30), "mul1": (2, 12), "mul2": (2, 10), "no_negative": False},
+    "hard":   {"ops": ('+', '-', '*'), "num1": (20, 100), "num2": (10, 70), "mul1": (5, 20), "mul2": (5, 15), "no_negative": False},
+}
+
+QUESTION_BATCH_SIZE = 256 # Questions generated per pool refill (expression tiers)
+
+# ========== Enumerated Question Space ==========
+
+class QuestionSpace:
+    """Every distinct question one QUESTION_SPECS difficulty can produce, indexed.
+
+    Questions are grouped by operator: op_ranges[i] is the (start, stop) index range of ops[i]'s
+    questions in the flat questions/answers tables. Picking the operator first keeps the operator
+    mix of the original generator (e.g. a third multiplications), although '*' has far fewer questions.
+    """
+
+    __slots__ = ("difficulty", "ops", "op_ranges", "questions", "answers")
+
+    def __init__(self, difficulty):
+        spec = QUESTION_SPECS[difficulty]
+        self.difficulty = difficulty
+        self.ops = spec["ops"]
+        self.op_ranges = []
+        self.questions = []
+        self.answers = array('i')
+        for op in self.ops:
+            lo1, hi1 = spec["mul1"] if op == '*' else spec["num1"]
+            lo2, hi2 = spec["mul2"] if op == '*' else spec["num2"]
+            pairs = {(a, b) for a in range(lo1, hi1 + 1) for b in range(lo2, hi2 + 1)}
+            if op == '-' and spec["no_negative"]: pairs = {(max(a, b), min(a, b)) for a, b in pairs}
+            start = len(self.questions)
+            for a, b in sorted(pairs):
+                self.questions.append(f"{a} {op} {b}")
+                self.answers.append(OPERATORS[op](a, b))
+            self.op_ranges.append((start, len(self.questions)))
+
+    def __len__(self):
+        return len(self.questions)
+
+    def question(self, index):
+        """The (question_str, answer, difficulty) at a flat index."""
+        return self.questions[index], self.answers[index], self.difficulty
+
+_question_spaces = {}
+
+def question_space(difficulty):
+    """The QuestionSpace of a QUESTION_SPECS difficulty, built on first use and then shared."""
+    space = _question_spaces.get(difficulty)
+    if space is None: space = _question_spaces[difficulty] = QuestionSpace(difficulty)
+    return space
+
+class QuestionSampler:
+    """Draws one difficulty's questions without replacement, O(1) per draw.
+
+    Each operator's index range is shuffled lazily (Fisher-Yates, keeping only the swapped positions in a
+    dict), so no question repeats until that operator's questions are used up; then a new shuffle starts.
+    """
+
+    def __init__(self, difficulty, rng=random):
+        self.space = question_space(difficulty)
+        self.rng = rng
+        self._drawn = [0] * len(self.space.ops) # Per operator: questions drawn in the current shuffle
+        self._swaps = [{} for _ in self.space.ops] # Per operator: shuffled position -> offset, where it isn't the identity
+
+    def draw(self):
+        """Returns the next (question_str, answer, difficulty)."""
+        random_float = self.rng.random # int(random() * n) is a fraction of randrange()'s cost; the bias is ~n / 2**53
+        op_index = int(random_float() * len(self._drawn))
+        start, stop = self.space.op_ranges[op_index]
+        drawn, swaps = self._drawn[op_index], self._swaps[op_index]
+        if drawn == stop - start: # Every question of this operator has been asked; reshuffle
+            drawn = 0
+            swaps.clear()
+        j = drawn + int(random_float() * (stop - start - drawn))
+        offset = swaps.get(j, j)
+        swaps[j] = swaps.pop(drawn, drawn)
+        self._drawn[op_index] = drawn + 1
+        return self.space.question(start + offset)
+
+# ========== Generation ==========
+
+def generate_question_data(difficulty_mode, rng=random):
+    """Generates question components based on the chosen difficulty mode (independent draws; sessions use QuestionPool)."""
+    if difficulty_mode == "random":
+        actual_difficulty = rng.choice(DIFFICULTY_LEVELS)
+    else:
+        actual_difficulty = difficulty_mode
+
+    if actual_difficulty in EXPRESSION_TIERS: # Multi-operand tiers come from the expression engine
+        question_str, answer = generate_expression(actual_difficulty, rng)
+        return question_str, answer, actual_difficulty
+
+    spec = QUESTION_SPECS.get(actual_difficulty)
+    if spec is None: # Fallback
+        print(f"Warning: Unknown difficulty '{actual_difficulty}', defaulting to easy.")
+        return "5 + 3", 8, "easy"
+
+    space = question_space(actual_difficulty) # An index lookup: no string building or arithmetic per question
+    start, stop = space.op_ranges[int(rng.random() * len(space.ops))]
+    return space.question(start + int(rng.random() * (stop - start)))
+
+def max_question_length():
+    """Longest question text any difficulty can produce, e.g. to size a table column."""
+    plain = max(len(str(spec[wide1][1])) + len(" + ") + len(str(spec[wide2][1]))
+                for spec in QUESTION_SPECS.values() for wide1, wide2 in (("num1", "num2"), ("mul1", "mul2")) if spec[wide1])
+    return max([plain] + [max_expression_length(tier) for tier in EXPRESSION_TIERS])
+
+def question_operator(question_str):
+    """The question's operator, or 'mixed' for multi-operand questions using several operators."""
+    ops = {tok for tok in question_str.split() if tok in "+-*/"}
+    return ops.pop() if len(ops) == 1 else "mixed"
+
+class QuestionPool:
+    """A stream of questions for one difficulty mode.
+
+    Easy/medium/hard (and random, which picks one of them per question) are drawn from the enumerated
+    question spaces without replacement, so a stream never repeats a question before exhausting it.
+    Expression tiers are too large to enumerate and are prefetched a batch at a time.
+    """
+
+    def __init__(self, difficulty_mode, batch_size=QUESTION_BATCH_SIZE, rng=random):
+        self.difficulty_mode = difficulty_mode
+        self.batch_size = batch_size
+        self.rng = rng
+        self._samplers = {} # difficulty -> QuestionSampler
+        self._questions = []
+        self._pos = 0
+
+    def next_question(self):
+        """Returns the next (question_str, answer, actual_difficulty)."""
+        difficulty = self.difficulty_mode
+        if difficulty == "random": difficulty = self.rng.choice(DIFFICULTY_LEVELS)
+        if difficulty in QUESTION_SPECS:
+            sampler = self._samplers.get(difficulty)
+            if sampler is None: sampler = self._samplers[difficulty] = QuestionSampler(difficulty, self.rng)
+            return sampler.draw()
+        if self._pos >= len(self._questions):
+            self._questions = [generate_expression(difficulty, self.rng) + (difficulty,) for _ in range(self.batch_size)]
+            self._pos = 0
+        question = self._questions[self._pos]
+        self._pos += 1
+        return question
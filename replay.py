@@ -0,0 +1,309 @@
+# replay.py - Compact binary session records and a full-speed replay driver (no Tk imports)
+#
+# File layout (little-endian): b"MMRP", format version (u8), then one block per session:
+#   block length (u32), seed (u64), flags (u8), mode (u8), total questions (u32, 0 = endless),
+#   final score (u32), question batch size (u16), player name (u8 length + UTF-8), events...
+# (Version 1 files, still readable, had u16 total questions and final score.)
+# Each event is kind (u8) + microseconds since the previous event (u32), then a kind-specific payload:
+#   QUESTION: actual difficulty (u8), correct answer (i32), question (u8 length + UTF-8)
+#   ANSWER:   result (u8), answer as typed (u8 length + UTF-8)
+#   RETRY / SKIP / TIMEOUT / FINISH: nothing
+# A 10-question game is typically ~250 bytes.
+
+import os
+import random
+import shutil
+import struct
+import time
+from engine import QuizSession, simulate_session
+from questions import QuestionPool
+
+RECORD_MAGIC = b"MMRP"
+RECORD_VERSION = 2
+FLAG_OWN_STREAM = 1 # The session drew its questions from its own seeded stream, so the seed reproduces them
+
+# Code tables; append only, the codes are stored in record files
+MODE_CODES = ("easy", "medium", "hard", "random", "expert", "master")
+RESULT_CODES = ("Correct", "Correct (Retry)", "Wrong (Retry Failed)", "Wrong (Skipped)", "Timeout",
+                "Invalid (Empty)", "Invalid (Non-numeric)", "Retry Offered")
+
+EVENT_QUESTION, EVENT_ANSWER, EVENT_RETRY, EVENT_SKIP, EVENT_TIMEOUT, EVENT_FINISH = range(6)
+EVENT_NAMES = ("question", "answer", "retry", "skip", "timeout", "finish")
+
+_HEADERS = {1: struct.Struct("<QBBHHH"), 2: struct.Struct("<QBBIIH")} # Format version -> session header
+_HEADER = _HEADERS[RECORD_VERSION]
+_EVENT = struct.Struct("<BI")
+_QUESTION = struct.Struct("<Bi")
+_LENGTH = struct.Struct("<I")
+MAX_DELTA_US = 0xFFFFFFFF # ~71 minutes between two events; longer gaps are clamped
+MAX_BLOCK_SIZE = 0xFFFFFFFF # Largest session block the u32 length can describe
+RECORD_SPOOL_BYTES = 1 << 16 # Event bytes a recorder keeps in RAM; more are spilled to a temporary spool file
+
+class RecordError(ValueError):
+    """A record file is malformed, or a replayed session did not match its record."""
+
+def _pack_text(text):
+    data = text.encode("utf-8")[:255]
+    return bytes((len(data),)) + data
+
+def _unpack_text(block, pos):
+    end = pos + 1 + block[pos]
+    return block[pos + 1:end].decode("utf-8", "replace"), end
+
+class SessionRecorder:
+    """Collects one session's events as they happen; pass as QuizSession(recorder=...).
+
+    Times are the session's latency_clock readings, stored as deltas so the replay can feed the
+    same timings back through a fake clock. Events are encoded as they arrive; past RECORD_SPOOL_BYTES
+    they are streamed to a temporary spool file, so an endless drill's recorder stays small in memory.
+    """
+
+    def __init__(self, spool_bytes=RECORD_SPOOL_BYTES):
+        self.events = bytearray() # Not yet spilled to the spool
+        self.spool_bytes = spool_bytes
+        self._spool = None
+        self._spooled = 0
+        self._last = None
+
+    @property
+    def size(self):
+        """Encoded event bytes so far."""
+        return self._spooled + len(self.events)
+
+    def _event(self, kind, now, payload=b""):
+        delta = 0 if self._last is None else min(MAX_DELTA_US, max(0, round((now - self._last) * 1e6)))
+        self._last = now
+        self.events += _EVENT.pack(kind, delta)
+        self.events += payload
+        if len(self.events) >= self.spool_bytes: self._spill()
+
+    def _spill(self):
+        if self._spool is None:
+            import tempfile # Only long drills need it
+            self._spool = tempfile.TemporaryFile(prefix="mindmath_record_")
+        self._spool.write(self.events)
+        self._spooled += len(self.events)
+        self.events.clear()
+
+    def question(self, now, question, answer, difficulty):
+        self._event(EVENT_QUESTION, now, _QUESTION.pack(MODE_CODES.index(difficulty), answer) + _pack_text(question))
+
+    def answer(self, now, text, result):
+        self._event(EVENT_ANSWER, now, bytes((RESULT_CODES.index(result),)) + _pack_text(text))
+
+    def retry(self, now):
+        self._event(EVENT_RETRY, now)
+
+    def skip(self, now):
+        self._event(EVENT_SKIP, now)
+
+    def timeout(self, now):
+        self._event(EVENT_TIMEOUT, now)
+
+    def finish(self, now):
+        self._event(EVENT_FINISH, now)
+
+    def write_to(self, f, session):
+        """Writes the finished session to f as one length-prefixed record block, copying any spool in chunks."""
+        flags = FLAG_OWN_STREAM if session.owns_question_stream else 0
+        try:
+            head = (_HEADER.pack(session.seed, flags, MODE_CODES.index(session.difficulty_mode), session.total_questions or 0,
+                                 session.score, session.question_pool.batch_size)
+                    + _pack_text(session.player_name))
+        except struct.error as e:
+            raise RecordError(f"session does not fit a record header: {e}") from None
+        size = len(head) + self.size
+        if size > MAX_BLOCK_SIZE: raise RecordError(f"session record is too large ({size:,} bytes)")
+        f.write(_LENGTH.pack(size) + head)
+        if self._spool is not None:
+            self._spool.seek(0)
+            shutil.copyfileobj(self._spool, f)
+        f.write(self.events)
+
+    def close(self):
+        """Deletes the spool file, if any."""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+def open_record_file(path):
+    """Opens a record file for appending, writing the file header if it is new."""
+    f = open(path, "ab")
+    if f.tell() == 0:
+        f.write(RECORD_MAGIC + bytes((RECORD_VERSION,)))
+        return f
+    with open(path, "rb") as existing:
+        version = existing.read(len(RECORD_MAGIC) + 1)[-1:]
+    if version != bytes((RECORD_VERSION,)):
+        f.close()
+        raise RecordError(f"{path} was written by another record version; record to a new file")
+    return f
+
+def append_record(path, session):
+    """Appends a finished, recorded session to a record file, then releases the recorder's spool."""
+    try:
+        with open_record_file(path) as f:
+            session.recorder.write_to(f, session)
+    finally:
+        session.recorder.close()
+
+class SessionRecord:
+    """One decoded session: header fields plus (kind, delta_seconds, payload) events."""
+
+    __slots__ = ("seed", "own_stream", "mode", "total_questions", "score", "batch_size", "player_name", "events")
+
+    def __init__(self, block, version=RECORD_VERSION):
+        header = _HEADERS[version]
+        seed, flags, mode, total, self.score, self.batch_size = header.unpack_from(block)
+        self.seed = seed
+        self.own_stream = bool(flags & FLAG_OWN_STREAM)
+        self.mode = MODE_CODES[mode]
+        self.total_questions = total or None
+        self.player_name, pos = _unpack_text(block, header.size)
+        self.events = []
+        while pos < len(block):
+            kind, delta = _EVENT.unpack_from(block, pos)
+            pos += _EVENT.size
+            if kind == EVENT_QUESTION:
+                difficulty, answer = _QUESTION.unpack_from(block, pos)
+                question, pos = _unpack_text(block, pos + _QUESTION.size)
+                payload = (question, answer, MODE_CODES[difficulty])
+            elif kind == EVENT_ANSWER:
+                result = RESULT_CODES[block[pos]]
+                text, pos = _unpack_text(block, pos + 1)
+                payload = (text, result)
+            elif kind < len(EVENT_NAMES):
+                payload = None
+            else:
+                raise RecordError(f"Unknown event kind {kind}")
+            self.events.append((kind, delta / 1e6, payload))
+
+    def questions(self):
+        return [payload for kind, _, payload in self.events if kind == EVENT_QUESTION]
+
+def iter_records(path):
+    """Yields the SessionRecords in a record file, in the order they were written."""
+    with open(path, "rb") as f:
+        header = f.read(len(RECORD_MAGIC) + 1)
+        if header[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+            raise RecordError(f"{path} is not a MindMath record file")
+        version = header[-1]
+        if version not in _HEADERS:
+            raise RecordError(f"{path}: unsupported record version {version}")
+        while True:
+            length = f.read(_LENGTH.size)
+            if not length: return
+            size = _LENGTH.unpack(length)[0] if len(length) == _LENGTH.size else -1
+            block = f.read(max(size, 0))
+            if len(block) != size:
+                raise RecordError(f"{path}: truncated record") # e.g. a crash mid-append; earlier records are intact
+            yield SessionRecord(block, version)
+
+class ReplayClock:
+    """A fake clock that only moves when the replay advances it; serves as both of a session's clocks."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordedPool:
+    """Hands out a record's questions in order, for sessions that drew from a shared (unseeded) pool."""
+
+    def __init__(self, questions):
+        self._questions = iter(questions)
+
+    def next_question(self):
+        return next(self._questions)
+
+def replay_session(record):
+    """Plays a record's events through a new QuizSession at full speed. Returns the finished session.
+
+    Sessions that had their own stream regenerate their questions from the seed, so a change to the
+    generators shows up as a mismatch; other sessions are fed the recorded questions. Every result and
+    the final score must match the record, otherwise RecordError is raised.
+    """
+    clock = ReplayClock()
+    if record.own_stream:
+        pool = QuestionPool(record.mode, record.batch_size, random.Random(record.seed))
+    else:
+        pool = RecordedPool(record.questions())
+    session = QuizSession(record.player_name, record.mode, record.total_questions, pool, clock=clock, latency_clock=clock, seed=record.seed)
+    for i, (kind, delta, payload) in enumerate(record.events):
+        clock.now += delta
+        if kind == EVENT_QUESTION:
+            question = session.next_question()
+            actual = (question, session.correct_answer, session.actual_difficulty)
+            if actual != payload:
+                raise RecordError(f"event {i}: question {actual} does not match recorded {payload}")
+        elif kind == EVENT_ANSWER:
+            text, expected = payload
+            result = session.submit(text).result
+            if result != expected:
+                raise RecordError(f"event {i}: answer {text!r} gave {result!r}, recorded {expected!r}")
+        elif kind == EVENT_RETRY:
+            session.retry()
+        elif kind == EVENT_SKIP:
+            session.skip()
+        elif kind == EVENT_TIMEOUT:
+            session.timeout()
+        else:
+            session.finish()
+    if not session.is_finished and session.next_question() is not None:
+        raise RecordError("record ends before the session does")
+    if session.score != record.score:
+        raise RecordError(f"final score {session.score} does not match recorded {record.score}")
+    return session
+
+def replay_file(path):
+    """Replays every session in a record file. Returns (sessions, mismatches, elapsed_seconds, errors)."""
+    records = list(iter_records(path)) # Decode first, so the timing covers only the game logic
+    errors = []
+    start = time.perf_counter()
+    for n, record in enumerate(records):
+        try:
+            replay_session(record).close()
+        except (RecordError, ValueError, StopIteration) as e: # ValueError: an action the session refused in that state
+            errors.append(f"session {n} ({record.player_name}, {record.mode}): {e}")
+    return len(records), len(errors), time.perf_counter() - start, errors
+
+def record_simulated(path, sessions, mode, seed=None, total_questions=10):
+    """Appends simulated sessions to a record file; with a seed the whole file is reproducible."""
+    rng = random.Random(seed)
+    clock = ReplayClock() # Simulated players answer at made-up speeds instead of the wall clock
+    def latency_clock():
+        clock.now += rng.uniform(0.5, 8.0)
+        return clock.now
+    with open_record_file(path) as f:
+        for _ in range(sessions):
+            recorder = SessionRecorder()
+            session = simulate_session(mode, rng, total_questions=total_questions, recorder=recorder, latency_clock=latency_clock)
+            recorder.write_to(f, session)
+            recorder.close()
+            session.close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Record simulated MindMath sessions, or replay a record file through the engine.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_cmd = commands.add_parser("record", help="append simulated sessions to a record file")
+    record_cmd.add_argument("path")
+    record_cmd.add_argument("--sessions", type=int, default=1000)
+    record_cmd.add_argument("--mode", default="random", choices=MODE_CODES)
+    record_cmd.add_argument("--questions", type=int, default=10)
+    record_cmd.add_argument("--seed", type=int, default=None)
+    play_cmd = commands.add_parser("play", help="replay a record file and check every session")
+    play_cmd.add_argument("path")
+    args = parser.parse_args()
+    if args.command == "record":
+        record_simulated(args.path, args.sessions, args.mode, args.seed, args.questions)
+        print(f"Recorded {args.sessions} sessions to {args.path} ({os.path.getsize(args.path):,} bytes)")
+    else:
+        try:
+            count, mismatches, elapsed, errors = replay_file(args.path)
+        except RecordError as e:
+            parser.exit(2, f"{e}\n")
+        for error in errors[:20]: print(error)
+        print(f"Replayed {count} sessions in {elapsed:.3f}s = {count / elapsed if elapsed else 0:,.0f} sessions/s, {mismatches} mismatches")
+        raise SystemExit(1 if mismatches else 0)
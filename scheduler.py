@@ -0,0 +1,102 @@
+# scheduler.py - One monotonic-clock timer for all GUI deadlines (no Tk imports; needs any object with after/after_cancel)
+
+import heapq
+import itertools
+import math
+import time
+
+class ScheduledCall:
+    """Handle returned by TickScheduler.call_at/call_later; pass it to cancel()."""
+
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+class TickScheduler:
+    """Keeps every deadline (timeouts, feedback delays, countdown redraws) in one heap driven by time.monotonic().
+
+    Only one root.after() is ever pending, armed for the earliest deadline, so cancelled or stale
+    callbacks can't pile up and nothing drifts by chaining fixed 1000 ms delays.
+    """
+
+    def __init__(self, root, clock=time.monotonic):
+        self.root = root
+        self.clock = clock
+        self._heap = [] # (deadline, seq, ScheduledCall)
+        self._seq = itertools.count()
+        self._after_id = None
+        self._armed_for = None
+        self.metrics = None # Optional metrics.Metrics: records how late each callback runs
+
+    def call_at(self, deadline, callback, *args):
+        """Runs callback(*args) once clock() >= deadline."""
+        call = ScheduledCall(deadline, callback, args)
+        heapq.heappush(self._heap, (deadline, next(self._seq), call))
+        if self._armed_for is None or deadline < self._armed_for:
+            self._arm()
+        return call
+
+    def call_later(self, delay_s, callback, *args):
+        return self.call_at(self.clock() + delay_s, callback, *args)
+
+    def cancel(self, call):
+        if call is not None: call.cancelled = True # Dropped lazily when it reaches the top of the heap
+
+    def cancel_all(self):
+        """Drops every pending call, e.g. when the game moves to another question or screen."""
+        self._heap.clear()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self._armed_for = None
+
+    def _arm(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = self._armed_for = None
+        if not self._heap: return
+        deadline = self._heap[0][0]
+        delay_ms = max(0, math.ceil((deadline - self.clock()) * 1000))
+        self._after_id = self.root.after(delay_ms, self._run_due)
+        self._armed_for = deadline
+
+    def _run_due(self):
+        self._after_id = self._armed_for = None
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, call = heapq.heappop(self._heap)
+            if not call.cancelled:
+                if self.metrics is not None:
+                    self.metrics.observe(f"after_late.{getattr(call.callback, '__name__', 'call')}", self.clock() - call.deadline)
+                call.callback(*call.args)
+        if self._after_id is None: self._arm() # A callback may already have re-armed us
+
+class Countdown:
+    """Redraws a seconds countdown only when the displayed whole second changes."""
+
+    def __init__(self, scheduler, start, limit, on_change):
+        self.scheduler = scheduler
+        self.start = start
+        self.limit = limit
+        self.on_change = on_change # Called with the remaining whole seconds
+        self._shown = None
+        self._next_second = 1
+        self._tick()
+
+    def _tick(self):
+        now = self.scheduler.clock()
+        whole_seconds = int(now - self.start)
+        if now >= self.start + self._next_second: # Float rounding can make int() land just short of the boundary we woke for
+            whole_seconds = max(whole_seconds, self._next_second)
+        remaining = max(0, self.limit - whole_seconds)
+        if remaining != self._shown:
+            self._shown = remaining
+            self.on_change(remaining)
+        if remaining > 0: # Wake exactly at the next whole-second boundary
+            self._next_second = whole_seconds + 1
+            self.scheduler.call_at(self.start + self._next_second, self._tick)
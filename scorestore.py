@@ -0,0 +1,752 @@
+# scorestore.py - Pluggable score storage for MindMath (plain text or indexed SQLite)
+
+import heapq
+import itertools
+import json
+import locale
+import os
+import re
+import sqlite3
+import threading
+import time
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+from stats import LatencyReport, PlayerStats
+
+# Matches the 'Score/Total (Mode)' part of a legacy score line
+SCORE_PART_RE = re.compile(r"^(\d+)\s*/\s*(\d+)\s*(?:\((\w+)\))?")
+
+# Text-store compaction
+HOT_HEADER_PREFIX = "# mindmath-hot" # First line of a compacted score file; has no comma, so it can't be a score line
+HOT_HEADER_RE = re.compile(r"^# mindmath-hot segment=(\d+) tail=(\d+)")
+HOT_SIZE = 20 # Entries kept per mode in the hot file; top(limit) with a larger limit reads the archives too
+COMPACT_THRESHOLD_BYTES = 256 * 1024 # Uncompacted bytes (~10k games) before a compaction is worthwhile
+GROUP_COMMIT_MAX_LINES = 1000 # Most score lines appended (and fsynced) as one batch
+SQLITE_BUSY_TIMEOUT = 10.0 # Seconds to wait for another process's write transaction
+
+class ScoreStoreError(IOError):
+    """Raised when a score backend fails; subclasses IOError so callers can keep catching IOError."""
+
+# ========== Legacy Text Format ==========
+
+def format_score_str(score, total, mode):
+    """Builds the 'Score/Total (Mode)' string used by the text format and the leaderboard."""
+    return f"{score}/{total} ({mode.capitalize()})"
+
+def format_score_line(name, score, total, mode):
+    """One line of the text format: 'Name,Score/Total (Mode)' plus a newline."""
+    return f"{name},{format_score_str(score, total, mode)}\n"
+
+def parse_score_line(line):
+    """Parses a 'Name,Score/Total (Mode)' line. Returns (name, score_value, score_str); raises ValueError/IndexError if malformed."""
+    name, score_part = line.strip().split(",", 1)
+    score_part = score_part.strip()
+    if '/' in score_part:
+        score_value = int(score_part.split('/')[0])
+    else: # Handle older format or lines without '/'
+        score_value = int(score_part.split(' ')[0])
+    return name, score_value, score_part
+
+def score_mode(score_str):
+    """Extracts the lowercase mode from a 'Score/Total (Mode)' string, or '' if there is none."""
+    match = SCORE_PART_RE.match(score_str)
+    if match and match.group(3):
+        return match.group(3).lower()
+    return ""
+
+def score_total(score_str):
+    """Extracts the total from a 'Score/Total (Mode)' string, or 0 if there is none."""
+    match = SCORE_PART_RE.match(score_str)
+    return int(match.group(2)) if match else 0
+
+def player_stats_from_scores(scores):
+    """Backfills {name: PlayerStats} from (name, score_value, score_str) rows saved before stats were kept.
+
+    Only games played and per-mode best/mean can be recovered; operator accuracy and streaks start from zero.
+    """
+    players = {}
+    for name, score_value, score_str in scores:
+        stats = players.setdefault(name, PlayerStats())
+        stats.games += 1
+        counts = stats.modes.setdefault(score_mode(score_str), [0, 0, 0])
+        counts[0] += 1
+        counts[1] = max(counts[1], score_value)
+        counts[2] += score_value
+    return players
+
+def iter_score_file(path, offset=0):
+    """Yields (name, score_value, score_str) for every well-formed line of a text score file, from a byte offset."""
+    with open(path, "r") as f:
+        if offset: f.seek(offset)
+        for line_number, line in enumerate(f):
+            if line_number == 0 and not offset and HOT_HEADER_RE.match(line): continue # Compaction header; names may start with '#'
+            try:
+                yield parse_score_line(line)
+            except (ValueError, IndexError) as e:
+                print(f"Skipping malformed score line: {line.strip()} ({e})")
+
+def atomic_write(path, data):
+    """Crash-safe file replacement: write a temp file, fsync it, then os.replace() it over path.
+
+    data is bytes or an iterable of bytes chunks (streamed, for archive segments of any size).
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.writelines((data,) if isinstance(data, bytes) else data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"): # Make the rename itself durable (POSIX only)
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def hot_header(segment, tail):
+    """Fixed-width header, so its length doesn't depend on the offsets it records."""
+    return f"{HOT_HEADER_PREFIX} segment={segment:06d} tail={tail:012d}\n".encode("ascii")
+
+HOT_HEADER_SIZE = len(hot_header(0, 0))
+
+class HotSelection:
+    """Streams raw score lines and keeps the top `size` per mode (ties: earliest first) in bounded memory."""
+
+    def __init__(self, size):
+        self.size = size
+        self._heaps = {} # mode -> min-heap of (score, -index, raw line)
+        self._count = 0
+
+    def add(self, raw):
+        index = self._count
+        self._count += 1
+        try:
+            name, score_value, score_str = parse_score_line(raw.decode("utf-8", "replace"))
+        except (ValueError, IndexError):
+            return # Malformed lines stay in the archive only
+        heap = self._heaps.setdefault(score_mode(score_str), [])
+        entry = (score_value, -index, raw)
+        if len(heap) < self.size:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def lines(self):
+        """The kept lines in their original order."""
+        kept = [entry for heap in self._heaps.values() for entry in heap]
+        kept.sort(key=lambda entry: -entry[1])
+        return [raw for _, _, raw in kept]
+
+# ========== Inter-Process Writes ==========
+
+class FileLock:
+    """Exclusive advisory lock on a separate lock file, shared by every process (and thread) using the same score file.
+
+    fcntl.flock() on POSIX, msvcrt.locking() on Windows. A dedicated lock file is used because compaction
+    replaces the score file itself, which would silently drop a lock held on the old one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock() # Threads sharing this FileLock queue here rather than on the file
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """Returns False if blocking=False and another holder has the lock."""
+        if not self._thread_lock.acquire(blocking): return False
+        try:
+            f = open(self.path, "a+b")
+        except OSError:
+            self._thread_lock.release()
+            raise
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            self._thread_lock.release()
+            if blocking: raise
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        f, self._file = self._file, None
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class WriteTicket:
+    """Returned by GroupCommitWriter.submit(); wait() blocks until the line is on disk."""
+
+    __slots__ = ("line", "error", "_done")
+
+    def __init__(self, line):
+        self.line = line
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            raise ScoreStoreError(f"Error saving score: {self.error}") from self.error
+
+class GroupCommitWriter:
+    """Background appender: everything queued while the previous batch was being written goes out as one
+    locked append and one fsync, so many games finishing at once cost one disk flush instead of one each.
+    """
+
+    def __init__(self, path, lock, max_lines=GROUP_COMMIT_MAX_LINES):
+        self.path = path
+        self.lock = lock # FileLock held for each append
+        self.max_lines = max_lines
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, line):
+        ticket = WriteTicket(line)
+        with self._cond:
+            if self._closed: raise ScoreStoreError("Score writer is closed")
+            self._queue.append(ticket)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return ticket
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue: return # Closed and drained
+                batch, self._queue = self._queue[:self.max_lines], self._queue[self.max_lines:]
+            error = None
+            try:
+                with self.lock, open(self.path, "a") as f:
+                    f.write("".join(ticket.line for ticket in batch))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                error = e
+            for ticket in batch:
+                ticket.error = error
+                ticket._done.set()
+
+    def close(self):
+        """Writes everything still queued, then stops the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread: self._thread.join()
+
+# ========== Backends ==========
+
+PLAYER_STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS player_stats (name TEXT PRIMARY KEY, stats TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def read_player_stats(conn, name):
+    """A player's PlayerStats from a player_stats table (empty if they haven't played): one primary-key lookup."""
+    row = conn.execute("SELECT stats FROM player_stats WHERE name = ?", (name,)).fetchone()
+    return PlayerStats.from_dict(json.loads(row[0])) if row else PlayerStats()
+
+def apply_player_game(conn, name, mode, score, game, ranked):
+    """Adds a finished game to the player's player_stats row inside `with conn:`. Returns the updated PlayerStats."""
+    conn.execute("BEGIN IMMEDIATE") # Take the write lock before reading, so another process can't update in between
+    stats = read_player_stats(conn, name)
+    stats.add_game(mode.lower(), score, game, ranked)
+    conn.execute("INSERT INTO player_stats (name, stats) VALUES (?, ?) "
+                 "ON CONFLICT (name) DO UPDATE SET stats = excluded.stats", (name, json.dumps(stats.to_dict())))
+    return stats
+
+class TextScoreStore:
+    """Original append-only scores.txt backend, with compaction into archived segments.
+
+    compact() moves every line appended since the last compaction into an immutable segment under
+    <base>_archive/ and rewrites the live file as a header, the top HOT_SIZE entries per mode, and
+    then the new appends. The per-mode top entries of everything ever played are always in the live
+    file, so leaderboard reads scan only it. Full history is the archive segments plus the lines
+    after the hot block (the header's tail offset).
+    """
+
+    def __init__(self, path, hot_size=HOT_SIZE, compact_threshold=COMPACT_THRESHOLD_BYTES):
+        self.path = path
+        self.latency_path = os.path.splitext(path)[0] + "_latency.json" # Histogram buckets, next to the score file
+        self.players_path = os.path.splitext(path)[0] + "_players.db" # name -> PlayerStats totals, one SQLite row per player
+        self.legacy_players_path = os.path.splitext(path)[0] + "_players.json" # Whole-file stats kept by older versions
+        self._players_conn = None
+        self._players_lock = threading.Lock() # One connection shared by the GUI and worker threads
+        self.archive_dir = os.path.splitext(path)[0] + "_archive"
+        self.hot_size = hot_size
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock() # The live-file swap at the end of compact()
+        self.file_lock = FileLock(os.path.splitext(path)[0] + ".lock") # Every write to the score and latency files, across processes
+        self._compact_file_lock = FileLock(os.path.splitext(path)[0] + ".compact.lock") # One compaction at a time, across processes
+        self._compact_lock = threading.Lock()
+        self._compact_thread = None
+        self._writer = GroupCommitWriter(path, self.file_lock)
+
+    def add(self, name, score, total, mode):
+        """Appends a score and returns once it is on disk; concurrent adds share one locked write and fsync."""
+        if self._players_conn is None:
+            with self._players_lock:
+                self._players_db() # Backfill from the scores before this one, which add_player_game() will count
+        self._writer.submit(format_score_line(name, score, total, mode)).wait()
+
+    def top(self, limit=None, mode=None):
+        """Returns (name, score_value, score_str) sorted best first, optionally filtered by mode."""
+        if limit is not None and limit <= self.hot_size: # The live file holds every possible top-`hot_size` entry
+            if not os.path.exists(self.path): return []
+            source = iter_score_file(self.path)
+        else:
+            source = self.history()
+        scores = [s for s in source if mode is None or score_mode(s[2]) == mode]
+        scores.sort(key=lambda x: x[1], reverse=True) # Stable: ties keep file order
+        return scores if limit is None else scores[:limit]
+
+    def player_scores(self, name, limit=None):
+        """Returns a player's scores, best first."""
+        return [s for s in self.top() if s[0] == name][:limit]
+
+    # --- Compaction ---
+    def _segment_path(self, segment):
+        return os.path.join(self.archive_dir, f"segment-{segment:06d}.txt")
+
+    def _read_header(self):
+        """(last archived segment, byte offset where uncompacted lines start); (0, 0) for a never-compacted file."""
+        try:
+            with open(self.path, "rb") as f:
+                match = HOT_HEADER_RE.match(f.readline().decode("ascii", "replace"))
+        except FileNotFoundError:
+            return 0, 0
+        return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+    def history(self):
+        """Yields every score ever saved, oldest first: archive segments, then the live file's uncompacted tail."""
+        segment, tail = self._read_header()
+        for i in range(1, segment + 1):
+            yield from iter_score_file(self._segment_path(i))
+        if os.path.exists(self.path):
+            yield from iter_score_file(self.path, tail)
+
+    def needs_compaction(self):
+        segment, tail = self._read_header()
+        try:
+            return os.path.getsize(self.path) - tail > self.compact_threshold
+        except FileNotFoundError:
+            return False
+
+    def compact(self):
+        """Archives the uncompacted lines and rewrites the live file. Returns False if there was nothing to do.
+
+        Crash-safe at every step: a segment is only counted once the live file's header names it, so an
+        interrupted run leaves the old live file in charge and its half-made segment is overwritten next time.
+        """
+        with self._compact_lock:
+            if not self._compact_file_lock.acquire(blocking=False): return False # Another process is compacting
+            try:
+                return self._compact()
+            finally:
+                self._compact_file_lock.release()
+
+    def _compact(self):
+        if not os.path.exists(self.path): return False
+        segment, tail = self._read_header()
+        selection = HotSelection(self.hot_size)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size # Snapshot; later appends are carried over below
+            if size <= tail: return False
+            if tail:
+                f.seek(HOT_HEADER_SIZE)
+                for raw in f.read(tail - HOT_HEADER_SIZE).splitlines(keepends=True):
+                    selection.add(raw)
+            end = tail
+
+            def new_lines():
+                nonlocal end
+                for raw in f:
+                    if end + len(raw) > size or not raw.endswith(b"\n"): break # Incomplete last line
+                    end += len(raw)
+                    selection.add(raw)
+                    yield raw
+
+            segment += 1
+            os.makedirs(self.archive_dir, exist_ok=True)
+            atomic_write(self._segment_path(segment), new_lines())
+        body = b"".join(selection.lines())
+        header = hot_header(segment, HOT_HEADER_SIZE + len(body))
+        with self._lock, self.file_lock: # Appends made during the slow part above go into the new tail
+            with open(self.path, "rb") as f:
+                f.seek(end)
+                appended = f.read()
+            atomic_write(self.path, header + body + appended)
+        return True
+
+    def start_background_compaction(self):
+        """Compacts on a daemon thread if enough has been appended since the last compaction. Returns the thread or None."""
+        if (self._compact_thread and self._compact_thread.is_alive()) or not self.needs_compaction():
+            return None
+        self._compact_thread = threading.Thread(target=self._compact_quietly, name="score-compaction", daemon=True)
+        self._compact_thread.start()
+        return self._compact_thread
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except OSError as e: # Nothing is lost; the live file is still complete
+            print(f"Score file compaction failed: {e}")
+
+    def change_token(self):
+        """Cheap fingerprint of the file; changes whenever anyone appends to or replaces it."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def is_own_write(self, before, after, name, score, total, mode):
+        """True if the file went from token `before` to `after` by exactly one add() of this score: same file, grown by its line."""
+        if after is None: return False
+        line = format_score_line(name, score, total, mode).replace("\n", os.linesep) # As written by the text-mode append
+        expected_size = (before[0] if before else 0) + len(line.encode(locale.getpreferredencoding(False)))
+        return after[0] == expected_size and (before is None or after[2] == before[2])
+
+    def latency_report(self):
+        """All-time response-latency histograms (LatencyReport)."""
+        if not os.path.exists(self.latency_path): return LatencyReport()
+        try:
+            with open(self.latency_path, "r") as f:
+                return LatencyReport.from_bucket_counts(json.load(f))
+        except ValueError as e:
+            raise ScoreStoreError(f"Corrupt latency file '{self.latency_path}': {e}") from e
+
+    def add_latencies(self, report):
+        """Merges a game's LatencyReport into the stored histograms (rewritten atomically)."""
+        with self.file_lock: # Read-modify-write; another process may be merging its own game
+            merged = self.latency_report()
+            merged.merge(report)
+            atomic_write(self.latency_path, json.dumps(list(merged.bucket_counts())).encode("utf-8"))
+
+    def _players_db(self):
+        """The player stats database, opened on first use (caller holds _players_lock).
+
+        Each game updates one row, under SQLite's own lock rather than file_lock, so saving stats never holds
+        up score appends. The first open fills it once, from the older JSON file or else the score history.
+        """
+        if self._players_conn is not None: return self._players_conn
+        conn = None
+        try:
+            conn = sqlite3.connect(self.players_path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(PLAYER_STATS_SCHEMA)
+            backfilled = "SELECT 1 FROM meta WHERE key = 'player_stats_backfilled'"
+            if not conn.execute(backfilled).fetchone():
+                with self.file_lock, conn: # No score appends while the history is read, so no game is counted twice
+                    conn.execute("BEGIN IMMEDIATE")
+                    if not conn.execute(backfilled).fetchone(): # Another process may have filled it while we waited
+                        conn.executemany("INSERT INTO player_stats (name, stats) VALUES (?, ?)",
+                                         ((name, json.dumps(stats.to_dict())) for name, stats in self._initial_players().items()))
+                        conn.execute("INSERT INTO meta (key, value) VALUES ('player_stats_backfilled', '1')")
+        except sqlite3.Error as e:
+            if conn: conn.close()
+            raise ScoreStoreError(f"Could not open player stats database '{self.players_path}': {e}") from e
+        self._players_conn = conn
+        return conn
+
+    def _initial_players(self):
+        if not os.path.exists(self.legacy_players_path):
+            return player_stats_from_scores(self.history())
+        try:
+            with open(self.legacy_players_path, "r", encoding="utf-8") as f:
+                return {name: PlayerStats.from_dict(data) for name, data in json.load(f).items()}
+        except ValueError as e:
+            raise ScoreStoreError(f"Corrupt player stats file '{self.legacy_players_path}': {e}") from e
+
+    def player_stats(self, name):
+        """A player's all-time PlayerStats (empty if they haven't played): one primary-key lookup."""
+        with self._players_lock:
+            try:
+                return read_player_stats(self._players_db(), name)
+            except sqlite3.Error as e:
+                raise ScoreStoreError(f"Error reading player stats: {e}") from e
+
+    def add_player_game(self, name, mode, score, game, ranked=True):
+        """Applies a finished game (GameStats) to the player's stats row and returns the updated PlayerStats."""
+        with self._players_lock:
+            conn = self._players_db()
+            try:
+                with conn:
+                    return apply_player_game(conn, name, mode, score, game, ranked)
+            except sqlite3.Error as e:
+                raise ScoreStoreError(f"Error saving player stats: {e}") from e
+
+    def close(self):
+        self._writer.close()
+        if self._compact_thread: self._compact_thread.join()
+        with self._players_lock:
+            if self._players_conn: self._players_conn.close()
+            self._players_conn = None
+
+class SqliteScoreStore:
+    """Indexed SQLite backend (WAL mode). Top-N, per-mode and per-player queries walk an index instead of the whole table."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scores (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            mode TEXT NOT NULL,
+            score_str TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_scores_score ON scores (score DESC, id);
+        CREATE INDEX IF NOT EXISTS idx_scores_mode_score ON scores (mode, score DESC, id);
+        CREATE INDEX IF NOT EXISTS idx_scores_name_score ON scores (name, score DESC, id);
+        CREATE INDEX IF NOT EXISTS idx_scores_created ON scores (created);
+        CREATE TABLE IF NOT EXISTS latency_hist (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, key, bucket)
+        );
+    """ + PLAYER_STATS_SCHEMA
+
+    def __init__(self, path, legacy_path=None, read_only=False):
+        self.path = path
+        self._lock = threading.Lock() # One connection shared by the GUI and worker threads
+        try:
+            if read_only: # e.g. a shard collected for shardmerge.py: no schema changes, imports or backfills
+                from pathlib import Path
+                self._conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+                return
+            self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            if legacy_path: self._import_legacy(legacy_path)
+            self._backfill_player_stats()
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Could not open score database '{path}': {e}") from e
+
+    def _import_legacy(self, legacy_path):
+        """One-time import of a 'Name,Score/Total (Mode)' text file, done on the first run only."""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+        imported = 0
+        def rows(): # Streamed into executemany, so a 10M-line history is never held in memory
+            nonlocal imported
+            for name, score_value, score_str in TextScoreStore(legacy_path).history(): # Archived segments included
+                imported += 1
+                yield name, score_value, score_total(score_str), score_mode(score_str), score_str, 0.0
+        with self._conn:
+            self._conn.executemany("INSERT INTO scores (name, score, total, mode, score_str, created) VALUES (?, ?, ?, ?, ?, ?)", rows())
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (legacy_path,))
+        if imported: print(f"Imported {imported} scores from '{legacy_path}'.")
+
+    def _backfill_player_stats(self):
+        """One-time build of player_stats from scores saved before stats were kept."""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'player_stats_backfilled'").fetchone():
+            return
+        players = player_stats_from_scores(self._conn.execute("SELECT name, score, score_str FROM scores ORDER BY id"))
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO player_stats (name, stats) VALUES (?, ?)",
+                                   [(name, json.dumps(stats.to_dict())) for name, stats in players.items()])
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('player_stats_backfilled', '1')")
+
+    def _query(self, sql, params=()):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Error reading score database: {e}") from e
+
+    def add(self, name, score, total, mode):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT INTO scores (name, score, total, mode, score_str, created) VALUES (?, ?, ?, ?, ?, ?)",
+                                   (name, score, total, mode.lower(), format_score_str(score, total, mode), time.time()))
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Error saving score: {e}") from e
+
+    def top(self, limit=None, mode=None):
+        """Returns (name, score_value, score_str) sorted best first, optionally filtered by mode."""
+        limit = -1 if limit is None else limit # SQLite: negative LIMIT means no limit
+        if mode is None:
+            return self._query("SELECT name, score, score_str FROM scores ORDER BY score DESC, id LIMIT ?", (limit,))
+        return self._query("SELECT name, score, score_str FROM scores WHERE mode = ? ORDER BY score DESC, id LIMIT ?", (mode, limit))
+
+    def modes(self):
+        """The distinct modes scores were saved in, sorted."""
+        return [mode for mode, in self._query("SELECT DISTINCT mode FROM scores ORDER BY mode")]
+
+    def player_scores(self, name, limit=None):
+        """Returns a player's scores, best first."""
+        limit = -1 if limit is None else limit
+        return self._query("SELECT name, score, score_str FROM scores WHERE name = ? ORDER BY score DESC, id LIMIT ?", (name, limit))
+
+    def change_token(self):
+        """SQLite's data_version: changes only when another connection (process) commits."""
+        return self._query("PRAGMA data_version")[0][0]
+
+    def is_own_write(self, before, after, name, score, total, mode):
+        """True if nothing but our own add() happened in between: our commits leave data_version unchanged."""
+        return after == before
+
+    def latency_report(self):
+        """All-time response-latency histograms (LatencyReport)."""
+        return LatencyReport.from_bucket_counts(self._query("SELECT dimension, key, bucket, count FROM latency_hist"))
+
+    def add_latencies(self, report):
+        """Adds a game's LatencyReport bucket counts to the stored histograms."""
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT INTO latency_hist (dimension, key, bucket, count) VALUES (?, ?, ?, ?) "
+                                       "ON CONFLICT (dimension, key, bucket) DO UPDATE SET count = count + excluded.count",
+                                       list(report.bucket_counts()))
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Error saving response times: {e}") from e
+
+    def player_stats(self, name):
+        """A player's all-time PlayerStats (empty if they haven't played): one primary-key lookup."""
+        try:
+            with self._lock:
+                return read_player_stats(self._conn, name)
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Error reading score database: {e}") from e
+
+    def add_player_game(self, name, mode, score, game, ranked=True):
+        """Applies a finished game (GameStats) to the player's stats row and returns the updated PlayerStats."""
+        try:
+            with self._lock, self._conn:
+                return apply_player_game(self._conn, name, mode, score, game, ranked)
+        except sqlite3.Error as e:
+            raise ScoreStoreError(f"Error saving player stats: {e}") from e
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ========== Leaderboard Cache ==========
+
+class LeaderboardCache:
+    """Process-level top-K leaderboard per mode in front of a score store.
+
+    Scores saved through add() are applied to the cached heaps incrementally; the heaps are
+    only reloaded from the store when its change_token() shows that someone else wrote to it.
+    An add() only keeps the heaps if the token moved by exactly its own write (store.is_own_write);
+    anything else in that window, from another process or another thread's add(), forces a reload.
+    Thread-safe; the store write itself happens outside the lock so concurrent adds can share a group commit.
+    While any add() is in flight, top() reads the store instead of loading heaps, so a score can't be
+    both loaded from the store and pushed by its add().
+    """
+
+    def __init__(self, store, k):
+        self.store = store
+        self.k = k
+        self._lock = threading.Lock()
+        self._heaps = {} # mode (None = all modes) -> min-heap of (score, -seq, row), at most k entries
+        self._seq = itertools.count() # Lower seq ranks first on ties, like the stable sort in load_scores
+        self._token = None
+        self._adds_in_flight = 0
+
+    def _check_outside_change(self):
+        token = self.store.change_token()
+        if token != self._token:
+            self._heaps.clear()
+            self._token = token
+
+    def _load(self, mode):
+        heap = [(score, -next(self._seq), (name, score, score_str)) for name, score, score_str in self.store.top(self.k, mode)]
+        heapq.heapify(heap)
+        self._heaps[mode] = heap
+        return heap
+
+    def _push(self, heap, entry):
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def top(self, limit=None, mode=None):
+        """Returns up to `limit` (name, score_value, score_str) best first; O(K) when nothing changed on disk."""
+        if limit is None or limit > self.k:
+            return self.store.top(limit, mode)
+        with self._lock:
+            self._check_outside_change()
+            heap = self._heaps.get(mode)
+            if heap is None:
+                if self._adds_in_flight: return self.store.top(limit, mode)
+                heap = self._load(mode)
+            return [row for _, _, row in sorted(heap, reverse=True)[:limit]]
+
+    def add(self, name, score, total, mode):
+        """Saves a score through the store and applies it to the loaded heaps."""
+        with self._lock:
+            self._check_outside_change()
+            before = self._token
+            self._adds_in_flight += 1
+        try:
+            self.store.add(name, score, total, mode)
+        except BaseException:
+            with self._lock:
+                self._adds_in_flight -= 1
+            raise
+        with self._lock:
+            self._adds_in_flight -= 1 # In the same critical section as the push, so no top() can load the heaps in between
+            after = self.store.change_token()
+            if before != self._token or not self.store.is_own_write(before, after, name, score, total, mode):
+                self._heaps.clear() # Someone else wrote too; reload rather than guess what
+                self._token = None
+                return
+            self._token = after # Our own write is not an outside change
+            row = (name, score, format_score_str(score, total, mode))
+            entry = (score, -next(self._seq), row)
+            for heap_mode in (None, mode.lower()):
+                heap = self._heaps.get(heap_mode)
+                if heap is not None: self._push(heap, entry)
+
+    def invalidate(self):
+        with self._lock:
+            self._heaps.clear()
+            self._token = None
+
+def open_score_store(backend, text_path, db_path):
+    """Creates the configured backend: 'sqlite' (indexed, imports text_path on first run) or 'text'."""
+    if backend == "text":
+        return TextScoreStore(text_path)
+    if backend == "sqlite":
+        return SqliteScoreStore(db_path, legacy_path=text_path)
+    raise ValueError(f"Unknown score backend '{backend}'")
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3 or sys.argv[1] != "compact":
+        sys.exit("usage: python scorestore.py compact <scores.txt>")
+    store = TextScoreStore(sys.argv[2])
+    print("Compacted." if store.compact() else "Nothing to compact.")
@@ -0,0 +1,210 @@
+# server.py - Multi-session MindMath server (asyncio, line-delimited JSON over TCP)
+#
+# Protocol: one JSON object per line in each direction.
+#   client -> {"cmd": "start", "name": "Ann", "mode": "easy"}
+#   server -> {"event": "question", "index": 1, "total": 10, "question": "3 + 4", "time_limit": 40, "mode": "Easy"}
+#   client -> {"cmd": "answer", "answer": "7"}
+#   server -> {"event": "result", "result": "Correct", "correct_answer": 7, "score": 1, "streak": 1}
+#             (a first wrong answer gives {"event": "retry_offer"}; reply {"cmd": "retry"} or {"cmd": "skip"})
+#   server -> {"event": "game_over", "score": 7, "total": 10}
+#   client -> {"cmd": "leaderboard", "limit": 5, "mode": null}
+#   server -> {"event": "leaderboard", "scores": [["Ann", 7, "7/10 (Easy)"], ...]}
+# A question that is not answered within its time limit gets {"event": "result", "result": "Timeout", ...}.
+
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from engine import QuizSession
+from questions import DIFFICULTY_LEVELS
+from expressions import EXPRESSION_TIERS
+from scorestore import open_score_store, LeaderboardCache, TextScoreStore
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+LEADERBOARD_SIZE = 5
+MAX_LEADERBOARD_LIMIT = 100 # Most rows one leaderboard request may ask for
+SCORE_WORKERS = 8 # Threads blocked on score writes at once
+VALID_MODES = DIFFICULTY_LEVELS + ("random",) + tuple(EXPRESSION_TIERS)
+
+class SharedLeaderboard:
+    """One score store/cache for all sessions. All access runs on a small worker pool, off the event loop,
+    so games finishing together reach the store concurrently and share its group commits."""
+
+    def __init__(self, store):
+        self.cache = LeaderboardCache(store, LEADERBOARD_SIZE)
+        self._executor = ThreadPoolExecutor(max_workers=SCORE_WORKERS, thread_name_prefix="scores")
+
+    def add(self, name, score, total, mode):
+        """Queues a score write; the session does not wait for it."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.cache.add, name, score, total, mode)
+        future.add_done_callback(self._report_error)
+        return future
+
+    @staticmethod
+    def _report_error(future):
+        if not future.cancelled() and future.exception():
+            print(f"Error saving score: {future.exception()}")
+
+    def add_player_game(self, name, mode, score, game, ranked=True):
+        """Queues an update of the player's stats."""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.cache.store.add_player_game, name, mode, score, game, ranked)
+        future.add_done_callback(self._report_error)
+        return future
+
+    async def top(self, limit, mode=None):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.cache.top, limit, mode)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+class ClientSession:
+    """Drives one QuizSession for one connection, including its question timeout."""
+
+    def __init__(self, server, writer):
+        self.server = server
+        self.writer = writer
+        self.session = None
+        self.timeout_handle = None
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+    def _cancel_timeout(self):
+        if self.timeout_handle: self.timeout_handle.cancel(); self.timeout_handle = None
+
+    async def handle(self, message):
+        cmd = message.get("cmd")
+        if cmd == "start":
+            mode = message.get("mode", "medium")
+            if not isinstance(mode, str) or mode not in VALID_MODES:
+                self.send({"event": "error", "error": f"Unknown mode '{mode}'"})
+                return
+            self._cancel_timeout()
+            # Each game draws from its own seeded stream: no repeats within a game, and the seed reproduces it (replay.py)
+            self.session = QuizSession(str(message.get("name", "")).strip(), mode, clock=asyncio.get_running_loop().time)
+            self.next_question()
+        elif cmd == "leaderboard":
+            limit, mode = message.get("limit", LEADERBOARD_SIZE), message.get("mode")
+            if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LEADERBOARD_LIMIT:
+                self.send({"event": "error", "error": f"'limit' must be an integer from 1 to {MAX_LEADERBOARD_LIMIT}"})
+                return
+            if mode is not None and mode not in VALID_MODES:
+                self.send({"event": "error", "error": f"Unknown mode '{mode}'"})
+                return
+            scores = await self.server.leaderboard.top(limit, mode)
+            self.send({"event": "leaderboard", "scores": scores})
+        elif self.session is None:
+            self.send({"event": "error", "error": "Send a 'start' command first"})
+        elif cmd == "answer":
+            if not self.session.awaiting_answer:
+                self.send({"event": "error", "error": "No question is waiting for an answer"})
+                return
+            self._cancel_timeout() # Like the GUI, the timer stops once an answer is submitted
+            self.report(self.session.submit(str(message.get("answer", ""))))
+        elif cmd == "retry":
+            try:
+                self.session.retry()
+            except ValueError as e:
+                self.send({"event": "error", "error": str(e)})
+        elif cmd == "skip":
+            try:
+                self.report(self.session.skip())
+            except ValueError as e:
+                self.send({"event": "error", "error": str(e)})
+        else:
+            self.send({"event": "error", "error": f"Unknown command '{cmd}'"})
+
+    def report(self, outcome):
+        if not outcome.done:
+            self.send({"event": "retry_offer"})
+            return
+        self.send({"event": "result", "result": outcome.result, "correct_answer": outcome.correct_answer,
+                   "score": self.session.score, "streak": self.session.streak})
+        self.next_question()
+
+    def next_question(self):
+        session = self.session
+        question_str = session.next_question()
+        if question_str is None:
+            self.send({"event": "game_over", "score": session.score, "total": session.total_questions})
+            self.server.leaderboard.add(session.player_name, session.score, session.total_questions, session.difficulty_mode)
+            self.server.leaderboard.add_player_game(session.player_name, session.difficulty_mode, session.score, session.game_stats())
+            return
+        self.send({"event": "question", "index": session.current_question_index, "total": session.total_questions,
+                   "question": question_str, "time_limit": session.current_time_limit, "mode": session.mode_display()})
+        self.timeout_handle = asyncio.get_running_loop().call_later(session.current_time_limit, self._on_timeout, session)
+
+    def _on_timeout(self, session):
+        self.timeout_handle = None
+        if session is not self.session: return # Stale timer from an earlier game
+        outcome = session.timeout()
+        if outcome is not None and not self.writer.is_closing():
+            self.report(outcome)
+
+    def close(self):
+        self._cancel_timeout()
+
+class QuizServer:
+    def __init__(self, store):
+        self.leaderboard = SharedLeaderboard(store)
+        self.active_sessions = 0
+
+    async def handle_connection(self, reader, writer):
+        client = ClientSession(self, writer)
+        self.active_sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError): # Request line longer than the stream limit
+                    client.send({"event": "error", "error": "Request line too long"})
+                    await writer.drain()
+                    break
+                if not line: break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    client.send({"event": "error", "error": "Expected one JSON object per line"})
+                    continue
+                await client.handle(message)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            client.close()
+            self.active_sessions -= 1
+            writer.close()
+
+async def serve(host, port, store):
+    quiz_server = QuizServer(store)
+    server = await asyncio.start_server(quiz_server.handle_connection, host, port, limit=4096)
+    print(f"MindMath server listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        quiz_server.leaderboard.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MindMath multi-session server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", default=os.environ.get("MINDMATH_SCORE_BACKEND", "sqlite"), choices=("sqlite", "text"))
+    parser.add_argument("--scores", default="scores.txt", help="Text score file (imported into the database on first run)")
+    parser.add_argument("--db", default="scores.db", help="SQLite score database")
+    args = parser.parse_args(argv)
+    store = open_score_store(args.backend, args.scores, args.db)
+    if isinstance(store, TextScoreStore): store.start_background_compaction() # Keep leaderboard reads on the small hot file
+    try:
+        asyncio.run(serve(args.host, args.port, store))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
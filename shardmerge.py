@@ -0,0 +1,172 @@
+# shardmerge.py - Site-wide leaderboard merged from many installations' score files (no Tk imports)
+#
+#   python shardmerge.py --top 10 --state merge_state.json shards/*
+#
+# A shard is either backend's file: scores.db (the default) or scores.txt. Text shards are parsed with the
+# same rules as the app's leaderboard (iter_score_file/score_mode, archives included for compacted files);
+# databases are opened read-only and asked for their top K per mode. Each shard is read in a worker process
+# into its top K per mode. The global ranking is a k-way heap merge of those small lists, so re-merging after
+# one shard changed only re-reads that shard.
+
+import heapq
+import json
+import os
+from scorestore import HOT_SIZE, SqliteScoreStore, TextScoreStore, iter_score_file, score_mode
+
+MERGE_TOP_K = 10 # Entries kept per mode per shard; the most a merged leaderboard can show
+SQLITE_MAGIC = b"SQLite format 3\x00" # First bytes of every SQLite database file
+
+def is_sqlite_shard(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except FileNotFoundError:
+        return False
+
+def shard_token(path):
+    """Cheap fingerprint of a shard: the text store's change token, or for a database its file and WAL stats.
+
+    Commits in WAL mode may only touch the -wal file, so its size and mtime count too; an empty WAL (as left
+    by a read-only open) is the same as none.
+    """
+    if not is_sqlite_shard(path): return TextScoreStore(path).change_token()
+    st = os.stat(path)
+    try:
+        wal = os.stat(path + "-wal")
+        wal_token = (wal.st_size, wal.st_mtime_ns) if wal.st_size else None
+    except FileNotFoundError:
+        wal_token = None
+    return (st.st_size, st.st_mtime_ns, st.st_ino, wal_token)
+
+def shard_top(path, k):
+    """Reads one shard. Returns (change_token, {mode: [(score, index, name, score_str), ...] best first}).
+
+    Ties keep file order, as in TextScoreStore.top(); in a database, insertion order within each mode.
+    Module level so a process pool can pickle it.
+    """
+    token = shard_token(path)
+    if is_sqlite_shard(path):
+        store = SqliteScoreStore(path, read_only=True)
+        try:
+            return token, {mode: [(score, index, name, score_str) for index, (name, score, score_str) in enumerate(store.top(k, mode))]
+                           for mode in store.modes()}
+        finally:
+            store.close()
+    store = TextScoreStore(path)
+    # A compacted live file holds every per-mode top-HOT_SIZE entry, so small k never needs the archives
+    source = iter_score_file(path) if k <= HOT_SIZE and token is not None else store.history()
+    heaps = {} # mode -> min-heap of (score, -line_index, name, score_str)
+    for index, (name, score_value, score_str) in enumerate(source):
+        heap = heaps.setdefault(score_mode(score_str), [])
+        entry = (score_value, -index, name, score_str)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    tops = {mode: [(score, -neg_index, name, score_str) for score, neg_index, name, score_str in sorted(heap, reverse=True)]
+            for mode, heap in heaps.items()}
+    return token, tops
+
+def merge_tops(shard_tops, limit, mode=None, dedupe=True):
+    """K-way merge of per-shard top lists into (name, score_value, score_str) rows, best first.
+
+    shard_tops is a list of {mode: rows} from shard_top(), in shard order; ties rank the earlier shard,
+    then the earlier line, first. mode=None merges every mode. With dedupe, a row repeated across shards
+    (the same installation collected twice, or a shard copied from another) is only counted as often as
+    it occurs in the shard that has it most: score lines carry no game id, so the same player getting
+    the same score on two machines is indistinguishable from a copy.
+    """
+    runs = []
+    for shard_index, tops in enumerate(shard_tops):
+        modes = tops.keys() if mode is None else (mode,)
+        for run_mode in modes:
+            rows = tops.get(run_mode)
+            if rows: runs.append([(-score, shard_index, index, name, score_str) for score, index, name, score_str in rows])
+    merged = []
+    emitted = {} # (name, score_str) -> copies ranked so far
+    seen = {} # (shard, name, score_str) -> copies met so far in that shard
+    for neg_score, shard_index, _, name, score_str in heapq.merge(*runs):
+        if dedupe:
+            key = (name, score_str)
+            copies = seen[shard_index, name, score_str] = seen.get((shard_index, name, score_str), 0) + 1
+            if copies <= emitted.get(key, 0): continue # Another shard already supplied this copy
+            emitted[key] = copies
+        merged.append((name, -neg_score, score_str))
+        if len(merged) >= limit: break
+    return merged
+
+class ShardMerger:
+    """Keeps every shard's top-K lists and re-parses only the shards whose files changed.
+
+    update() compares each shard's change token (size, mtime, inode; see shard_token()) with the one it was
+    read at and re-reads the changed ones in parallel on a process pool. With state_path, the per-shard lists
+    are saved between runs, so a periodic re-merge of dozens of shards only reads the new ones.
+    """
+
+    def __init__(self, k=MERGE_TOP_K, state_path=None, workers=None):
+        self.k = k
+        self.state_path = state_path
+        self.workers = workers # None: one process per CPU
+        self.paths = []
+        self._shards = {} # path -> (token, {mode: rows})
+        if state_path and os.path.exists(state_path): self._load_state()
+
+    def _load_state(self):
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("k") != self.k: return # Lists of another length can't answer this merge
+        as_token = lambda token: tuple(as_token(part) if isinstance(part, list) else part for part in token) if token else None # JSON lists back to tuples
+        self._shards = {path: (as_token(token), {mode: [tuple(row) for row in rows] for mode, rows in tops.items()})
+                        for path, (token, tops) in state["shards"].items()}
+
+    def save(self):
+        """Writes the per-shard lists to state_path (if set) for the next run."""
+        if not self.state_path: return
+        from scorestore import atomic_write
+        state = {"k": self.k, "shards": {path: [token, tops] for path, (token, tops) in self._shards.items()}}
+        atomic_write(self.state_path, json.dumps(state, ensure_ascii=False).encode("utf-8"))
+
+    def update(self, paths):
+        """Sets the shards to merge (their order breaks ties) and re-parses changed ones. Returns the paths re-parsed."""
+        self.paths = [os.path.abspath(path) for path in paths]
+        for path in set(self._shards) - set(self.paths): del self._shards[path] # Shards no longer collected
+        changed = [path for path in self.paths
+                   if path not in self._shards or self._shards[path][0] != shard_token(path)]
+        if len(changed) > 1 and self.workers != 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(shard_top, changed, [self.k] * len(changed)))
+        else: # Not worth starting processes for
+            results = [shard_top(path, self.k) for path in changed]
+        self._shards.update(zip(changed, results))
+        return changed
+
+    def modes(self):
+        return sorted({mode for path in self.paths for mode in self._shards[path][1]})
+
+    def top(self, limit=None, mode=None, dedupe=True):
+        """The merged leaderboard, like main.top_scores(limit, mode): (name, score_value, score_str) best first."""
+        limit = self.k if limit is None else limit
+        if limit > self.k: raise ValueError(f"limit {limit} is larger than the per-shard top K ({self.k})")
+        return merge_tops([self._shards[path][1] for path in self.paths], limit, mode, dedupe)
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Merge many installations' score files into one site-wide leaderboard.")
+    parser.add_argument("shards", nargs="+", help="score files (scores.db or scores.txt), one per installation")
+    parser.add_argument("--top", type=int, default=MERGE_TOP_K, help="entries per leaderboard")
+    parser.add_argument("--mode", default=None, help="one mode only (default: overall and every mode)")
+    parser.add_argument("--state", default=None, help="file keeping per-shard results, so later runs only re-parse changed shards")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per CPU)")
+    parser.add_argument("--keep-duplicates", action="store_true", help="count rows repeated across shards every time")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    merger = ShardMerger(max(args.top, MERGE_TOP_K), args.state, args.workers)
+    changed = merger.update(args.shards)
+    merger.save()
+    for mode in ([args.mode] if args.mode else [None] + merger.modes()):
+        print(f"== {'Overall' if mode is None else (mode or 'no mode').capitalize()} ==")
+        for rank, (name, _, score_str) in enumerate(merger.top(args.top, mode, not args.keep_duplicates), start=1):
+            print(f"{rank:>3}. {name}: {score_str}")
+    print(f"{len(merger.paths)} shards ({len(changed)} parsed) merged in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,165 @@
+# stats.py - Streaming response-latency histograms (bounded memory, mergeable, percentiles) and per-player running totals
+
+import math
+
+HISTOGRAM_GROWTH = 1.05 # Each bucket is 5% wider than the last, so percentiles are accurate to ~5%
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+REPORT_PERCENTILES = (50, 90, 99)
+
+def bucket_for(ms):
+    """Bucket 0 holds everything under 1 ms; bucket b >= 1 holds [G^(b-1), G^b) ms."""
+    if ms < 1: return 0
+    return int(math.log(ms) / _LOG_GROWTH) + 1
+
+def bucket_value(bucket):
+    """Representative latency (ms) of a bucket: its geometric midpoint."""
+    if bucket == 0: return 0.5
+    return HISTOGRAM_GROWTH ** (bucket - 0.5)
+
+class LatencyHistogram:
+    """Log-bucketed histogram. Memory depends on the latency range (~300 buckets up to 10 minutes), not the sample count."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {}) # bucket -> count
+        self.total = sum(self.counts.values())
+
+    def add(self, seconds, count=1):
+        bucket = bucket_for(seconds * 1000)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += count
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+
+    def percentile(self, p):
+        """Approximate p-th percentile in seconds, or None if empty."""
+        if not self.total: return None
+        rank = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return bucket_value(bucket) / 1000
+        return bucket_value(max(self.counts)) / 1000
+
+class LatencyReport:
+    """Histograms per operator and per difficulty."""
+
+    DIMENSIONS = ("operator", "difficulty")
+
+    def __init__(self):
+        self.histograms = {dimension: {} for dimension in self.DIMENSIONS} # dimension -> key -> LatencyHistogram
+
+    def histogram(self, dimension, key):
+        group = self.histograms[dimension]
+        if key not in group: group[key] = LatencyHistogram()
+        return group[key]
+
+    def add(self, operator, difficulty, seconds):
+        self.histogram("operator", operator).add(seconds)
+        self.histogram("difficulty", difficulty).add(seconds)
+
+    def merge(self, other):
+        for dimension, group in other.histograms.items():
+            for key, hist in group.items():
+                self.histogram(dimension, key).merge(hist)
+
+    def rows(self, dimension):
+        """[(key, count, p50_s, p90_s, p99_s), ...] sorted by key."""
+        return [(key, hist.total) + tuple(hist.percentile(p) for p in REPORT_PERCENTILES)
+                for key, hist in sorted(self.histograms[dimension].items())]
+
+    def bucket_counts(self):
+        """Yields (dimension, key, bucket, count) for persistence."""
+        for dimension, group in self.histograms.items():
+            for key, hist in group.items():
+                for bucket, count in hist.counts.items():
+                    yield dimension, key, bucket, count
+
+    @classmethod
+    def from_bucket_counts(cls, rows):
+        report = cls()
+        for dimension, key, bucket, count in rows:
+            if dimension in report.histograms:
+                hist = report.histogram(dimension, key)
+                hist.counts[int(bucket)] = hist.counts.get(int(bucket), 0) + count
+                hist.total += count
+        return report
+
+class GameStats:
+    """One game's running per-operator accuracy and runs of first-try correct answers (updated per question)."""
+
+    __slots__ = ("operators", "answered", "leading_run", "run", "best_run")
+
+    def __init__(self):
+        self.operators = {} # operator -> [answered, correct]
+        self.answered = 0
+        self.leading_run = 0 # Correct answers before the first miss
+        self.run = 0 # Correct answers since the last miss (the streak the game ended on)
+        self.best_run = 0
+
+    def add(self, operator, correct):
+        counts = self.operators.setdefault(operator, [0, 0])
+        counts[0] += 1
+        if correct:
+            counts[1] += 1
+            if self.leading_run == self.answered: self.leading_run += 1
+            self.run += 1
+            self.best_run = max(self.best_run, self.run)
+        else:
+            self.run = 0
+        self.answered += 1
+
+class PlayerStats:
+    """A player's all-time totals, updated one game at a time: games played, best and mean score per
+    mode (leaderboard-length games only), accuracy per operator, and the current and best answer streak."""
+
+    __slots__ = ("games", "modes", "operators", "streak", "best_streak")
+
+    def __init__(self):
+        self.games = 0
+        self.modes = {} # mode -> [games, best score, score sum]
+        self.operators = {} # operator -> [answered, correct]
+        self.streak = 0 # Carries over from game to game
+        self.best_streak = 0
+
+    def add_game(self, mode, score, game, ranked=True):
+        """Applies one finished game (a GameStats). Unranked games (drills) skip the per-mode scores."""
+        self.games += 1
+        if ranked:
+            counts = self.modes.setdefault(mode, [0, 0, 0])
+            counts[0] += 1
+            counts[1] = max(counts[1], score)
+            counts[2] += score
+        for operator, (answered, correct) in game.operators.items():
+            counts = self.operators.setdefault(operator, [0, 0])
+            counts[0] += answered
+            counts[1] += correct
+        if game.answered:
+            self.best_streak = max(self.best_streak, self.streak + game.leading_run, game.best_run)
+            self.streak = self.streak + game.answered if game.leading_run == game.answered else game.run
+
+    def mode_rows(self):
+        """[(mode, games, best, mean), ...] sorted by mode."""
+        return [(mode, games, best, total / games) for mode, (games, best, total) in sorted(self.modes.items())]
+
+    def accuracy_rows(self):
+        """[(operator, answered, fraction correct), ...] sorted by operator."""
+        return [(operator, answered, correct / answered) for operator, (answered, correct) in sorted(self.operators.items())]
+
+    def to_dict(self):
+        return {"games": self.games, "modes": self.modes, "operators": self.operators, "streak": self.streak, "best_streak": self.best_streak}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.games = data.get("games", 0)
+        stats.modes = {mode: list(counts) for mode, counts in data.get("modes", {}).items()}
+        stats.operators = {operator: list(counts) for operator, counts in data.get("operators", {}).items()}
+        stats.streak = data.get("streak", 0)
+        stats.best_streak = data.get("best_streak", 0)
+        return stats
@@ -0,0 +1,36 @@
+# test_questions.py - Sampling without replacement from the enumerated question spaces (python -m unittest test_questions)
+
+import random
+import unittest
+from questions import DIFFICULTY_LEVELS, QuestionSampler, question_space
+
+class QuestionSamplerTest(unittest.TestCase):
+    """Within each operator's range, no question repeats until every question of that range has been drawn."""
+
+    def check_cycles(self, difficulty, cycles):
+        space = question_space(difficulty)
+        index_of = {question: i for i, question in enumerate(space.questions)}
+        op_of = {space.questions[i]: op_index for op_index, (start, stop) in enumerate(space.op_ranges) for i in range(start, stop)}
+        sizes = [stop - start for start, stop in space.op_ranges]
+        seen = [set() for _ in sizes] # Per operator: questions drawn in the current cycle
+        completed = [0] * len(sizes)
+        sampler = QuestionSampler(difficulty, random.Random(7))
+        while min(completed) < cycles:
+            question, answer, actual = sampler.draw()
+            self.assertEqual((answer, actual), space.question(index_of[question])[1:])
+            op_index = op_of[question]
+            self.assertNotIn(question, seen[op_index], f"{difficulty}: '{question}' repeated before its operator was exhausted")
+            seen[op_index].add(question)
+            if len(seen[op_index]) == sizes[op_index]: # Exhausted; the next shuffle starts over
+                seen[op_index].clear()
+                completed[op_index] += 1
+
+    def test_easy(self):
+        self.check_cycles("easy", 3)
+
+    def test_medium_and_hard(self):
+        for difficulty in DIFFICULTY_LEVELS[1:]:
+            self.check_cycles(difficulty, 1)
+
+if __name__ == "__main__":
+    unittest.main()
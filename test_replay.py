@@ -0,0 +1,67 @@
+# test_replay.py - Round trips through the binary session records (python -m unittest test_replay)
+
+import os
+import random
+import tempfile
+import unittest
+from engine import QuizSession, simulate_session
+from replay import (_HEADERS, _LENGTH, _pack_text, MODE_CODES, RECORD_MAGIC, ReplayClock, SessionRecorder,
+                    append_record, iter_records, record_simulated, replay_session)
+
+class ReplayRoundTripTest(unittest.TestCase):
+    """record -> iter_records -> replay_session gives back the recorded games."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "games.mmr")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def replay_all(self):
+        sessions = [replay_session(record) for record in iter_records(self.path)]
+        for session in sessions: session.close()
+        return sessions
+
+    def test_short_games(self):
+        record_simulated(self.path, 5, "random", seed=1)
+        records = list(iter_records(self.path))
+        self.assertEqual(len(records), 5)
+        self.assertEqual([session.score for session in self.replay_all()], [record.score for record in records])
+
+    def test_spooled_endless_drill(self):
+        clock = ReplayClock()
+        recorder = SessionRecorder(spool_bytes=64) # Spills after a few events
+        session = QuizSession("Ann", "medium", None, clock=clock, latency_clock=clock, recorder=recorder)
+        for _ in range(200):
+            session.next_question()
+            clock.now += 1.5
+            session.submit(str(session.correct_answer))
+        session.finish()
+        self.assertGreater(recorder.size, len(recorder.events)) # Most events are in the spool, not in memory
+        append_record(self.path, session)
+        session.close()
+        record, = iter_records(self.path)
+        self.assertIsNone(record.total_questions)
+        self.assertEqual(record.score, 200)
+        self.assertEqual(self.replay_all()[0].score, 200)
+
+    def test_version_1_file(self):
+        clock = ReplayClock()
+        def latency_clock():
+            clock.now += 2.0
+            return clock.now
+        recorder = SessionRecorder()
+        session = simulate_session("easy", random.Random(3), recorder=recorder, latency_clock=latency_clock)
+        header = _HEADERS[1].pack(session.seed, 1, MODE_CODES.index("easy"), session.total_questions, session.score,
+                                  session.question_pool.batch_size)
+        body = header + _pack_text(session.player_name) + recorder.events
+        with open(self.path, "wb") as f:
+            f.write(RECORD_MAGIC + bytes((1,)) + _LENGTH.pack(len(body)) + body)
+        record, = iter_records(self.path)
+        self.assertEqual((record.mode, record.total_questions, record.score), ("easy", 10, session.score))
+        self.assertEqual(self.replay_all()[0].score, session.score)
+        session.close()
+
+if __name__ == "__main__":
+    unittest.main()
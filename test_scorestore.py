@@ -0,0 +1,124 @@
+# test_scorestore.py - Regression tests for the score stores (python -m unittest test_scorestore)
+
+import json
+import os
+import tempfile
+import unittest
+from scorestore import LeaderboardCache, SqliteScoreStore, TextScoreStore, iter_score_file
+from stats import GameStats, PlayerStats
+
+class HashNameTest(unittest.TestCase):
+    """Player names may start with '#'; only a compacted file's first-line header is skipped."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "scores.txt")
+        with open(self.path, "w") as f:
+            f.write("#1Fan,10/10 (Easy)\nAnn,7/10 (Easy)\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_hash_name_on_first_line_is_parsed(self):
+        self.assertEqual([row[0] for row in iter_score_file(self.path)], ["#1Fan", "Ann"])
+
+    def test_hash_name_survives_compaction(self):
+        store = TextScoreStore(self.path, compact_threshold=0)
+        try:
+            self.assertTrue(store.compact())
+            store.add("#2Fan", 9, 10, "easy")
+            self.assertEqual([row[0] for row in store.top(5)], ["#1Fan", "#2Fan", "Ann"])
+            self.assertEqual(sorted(row[0] for row in store.history()), ["#1Fan", "#2Fan", "Ann"])
+        finally:
+            store.close()
+
+class LeaderboardCacheTest(unittest.TestCase):
+    """A write by someone else between our add() and its token check must not be taken for our own."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "scores.txt")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def check_outside_write_during_add(self, store, other):
+        cache = LeaderboardCache(store, 5)
+        cache.add("Ann", 5, 10, "easy")
+        self.assertEqual(cache.top(5), [("Ann", 5, "5/10 (Easy)")])
+        real_add = store.add
+        def add_racing_other_process(*args):
+            real_add(*args)
+            other.add("Bob", 9, 10, "easy") # Lands after our write, before the cache reads the token
+        store.add = add_racing_other_process
+        cache.add("Cid", 7, 10, "easy")
+        self.assertEqual([row[0] for row in cache.top(5)], ["Bob", "Cid", "Ann"])
+
+    def test_text_store(self):
+        store, other = TextScoreStore(self.path), TextScoreStore(self.path)
+        try:
+            self.check_outside_write_during_add(store, other)
+        finally:
+            store.close(); other.close()
+
+    def test_sqlite_store(self):
+        db_path = os.path.join(self.dir.name, "scores.db")
+        store, other = SqliteScoreStore(db_path), SqliteScoreStore(db_path)
+        try:
+            self.check_outside_write_during_add(store, other)
+        finally:
+            store.close(); other.close()
+
+    def test_own_adds_keep_the_cache(self):
+        store = TextScoreStore(self.path)
+        try:
+            cache = LeaderboardCache(store, 5)
+            cache.add("Ann", 5, 10, "easy")
+            cache.top(5)
+            cache.add("Cid", 7, 10, "easy")
+            store.top = None # The cached heaps must answer without reading the store
+            self.assertEqual([row[0] for row in cache.top(5)], ["Cid", "Ann"])
+        finally:
+            store.close()
+
+class TextPlayerStatsTest(unittest.TestCase):
+    """Text-store player stats: filled once from the history (or the older JSON file), then one row per game."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "scores.txt")
+        with open(self.path, "w") as f:
+            f.write("Ann,7/10 (Easy)\nAnn,9/10 (Easy)\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def game(self):
+        game = GameStats()
+        game.add("+", True)
+        return game
+
+    def test_backfill_then_add(self):
+        store, other = TextScoreStore(self.path), TextScoreStore(self.path)
+        try:
+            self.assertEqual(store.player_stats("Ann").games, 2)
+            store.add("Ann", 5, 10, "easy")
+            store.add_player_game("Ann", "easy", 5, self.game())
+            self.assertEqual(other.player_stats("Ann").games, 3) # Another process sees the row at once
+            self.assertEqual(other.player_stats("Ann").modes["easy"], [3, 9, 21])
+        finally:
+            store.close(); other.close()
+
+    def test_imports_older_json_file(self):
+        stats = PlayerStats()
+        stats.add_game("hard", 8, self.game())
+        with open(os.path.join(self.dir.name, "scores_players.json"), "w", encoding="utf-8") as f:
+            json.dump({"Zed": stats.to_dict()}, f)
+        store = TextScoreStore(self.path)
+        try:
+            self.assertEqual(store.player_stats("Zed").modes, {"hard": [1, 8, 8]})
+        finally:
+            store.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# widgets.py - Batched, incremental and virtualized Text rendering for the summary and leaderboard views
+
+import tkinter as tk
+
+def configure_tags(text_widget, tag_colors):
+    """Configures foreground-colour tags once, when the widget is created."""
+    for tag, color in tag_colors.items():
+        text_widget.tag_configure(tag, foreground=color)
+
+def insert_args(rows):
+    """Flattens (line, tag) rows into Text.insert(index, chars, tags, chars, tags, ...) arguments.
+
+    Consecutive rows with the same tag share one chunk, so a whole view is one insert call with
+    its tags applied by range.
+    """
+    args = []
+    for line, tag in rows:
+        tags = (tag,) if tag else ()
+        if args and args[-1] == tags:
+            args[-2] += line
+        else:
+            args.extend((line, tags))
+    return args
+
+def replace_text(text_widget, rows):
+    """Replaces a read-only Text's content with one delete and one insert. Returns False if nothing changed."""
+    rows = list(rows)
+    args = insert_args(rows)
+    if getattr(text_widget, "rendered_args", None) == args: return False
+    text_widget.config(state=tk.NORMAL)
+    text_widget.delete('1.0', tk.END)
+    if args: text_widget.insert('1.0', *args)
+    text_widget.config(state=tk.DISABLED)
+    text_widget.rendered_args = args
+    text_widget.rendered_rows = rows
+    return True
+
+def update_rows(text_widget, rows):
+    """Like replace_text(), but when the view keeps its shape (same number of one-line rows) only the
+    rows that differ from what is shown are rewritten, so unchanged rows keep their layout, selection
+    and scroll position. Returns the number of rows rewritten."""
+    rows = list(rows)
+    shown = getattr(text_widget, "rendered_rows", None)
+    if shown is None or len(shown) != len(rows) or not all(line.endswith("\n") and line.count("\n") == 1 for line, _ in rows + shown):
+        return len(rows) if replace_text(text_widget, rows) else 0
+    changed = [i for i, (row, old) in enumerate(zip(rows, shown)) if row != old]
+    if not changed: return 0
+    text_widget.config(state=tk.NORMAL)
+    for i in changed:
+        line, tag = rows[i]
+        text_widget.delete(f"{i + 1}.0", f"{i + 1}.end")
+        text_widget.insert(f"{i + 1}.0", line[:-1], (tag,) if tag else ())
+    text_widget.config(state=tk.DISABLED)
+    text_widget.rendered_args = insert_args(rows)
+    text_widget.rendered_rows = rows
+    return len(changed)
+
+class VirtualTextView:
+    """A read-only Text that only materializes the rows in view.
+
+    Rows come from row_source(start, stop) -> [(line, tag), ...], so formatting is also limited to the
+    visible window. The header rows stay fixed above the scrolling rows. Scrolling (scrollbar or mouse
+    wheel) re-renders the window with a single insert.
+    """
+
+    def __init__(self, text, scrollbar=None, visible_rows=None, frame=None):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.frame = frame # Container to pack, when created by create_virtual_text()
+        self.visible_rows = visible_rows or int(text.cget("height"))
+        self.header = []
+        self.row_count = 0
+        self.row_source = None
+        self.first_row = 0
+        if scrollbar is not None:
+            scrollbar.config(command=self.on_scrollbar)
+
+    @property
+    def body_rows(self):
+        return max(1, self.visible_rows - len(self.header))
+
+    def show(self, header, row_count, row_source, first_row=0):
+        """Displays row_count rows from row_source under the fixed header rows."""
+        self.header, self.row_count, self.row_source = list(header), row_count, row_source
+        self.first_row = -1 # Force a render
+        self.scroll_to(first_row)
+
+    def show_message(self, message):
+        self.show([(message, None)], 0, None)
+
+    def scroll_to(self, row):
+        row = max(0, min(row, self.row_count - self.body_rows))
+        if row == self.first_row: return
+        self.first_row = row
+        self.render()
+
+    def render(self):
+        stop = min(self.row_count, self.first_row + self.body_rows)
+        rows = self.header + (self.row_source(self.first_row, stop) if self.row_source else [])
+        replace_text(self.text, rows)
+        if self.scrollbar is not None:
+            if self.row_count > self.body_rows:
+                self.scrollbar.set(self.first_row / self.row_count, stop / self.row_count)
+            else:
+                self.scrollbar.set(0, 1)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * self.row_count))
+        elif action == "scroll":
+            step = self.body_rows if unit == "pages" else 1
+            self.scroll_to(self.first_row + int(amount) * step)
+
+    def on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.first_row - 3)
+        else:
+            self.scroll_to(self.first_row + 3)
+        return "break" # The Text itself only holds the visible rows; don't let it scroll
+
+def create_virtual_text(master, bg, **text_options):
+    """Builds a Frame with a Text and vertical Scrollbar wired up as a VirtualTextView (pack view.frame)."""
+    frame = tk.Frame(master, bg=bg)
+    text = tk.Text(frame, wrap=tk.NONE, bg=bg, **text_options)
+    scrollbar = tk.Scrollbar(frame, orient=tk.VERTICAL)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    view = VirtualTextView(text, scrollbar, frame=frame)
+    for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+        text.bind(sequence, view.on_wheel)
+    return view